@@ -2,17 +2,33 @@
 
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
-from datetime import datetime
+from datetime import date, datetime
 
+import click
 from dotenv import load_dotenv
-from flask import Flask, flash, redirect, render_template, request, session, url_for
+from flask import Flask, Response, current_app, flash, g, jsonify, redirect, render_template, request, session, url_for
 
 from app.config import Config
+from app.migrations import run_migrations
 from app.models import Favorite, MenuMatch, User, db
+from app.services.autocomplete import MenuAutocomplete
+from app.services.check_jobs import ManualCheckQueue
+from app.services.dashboard_cache import DashboardCache, invalidate_dashboard, load_dashboard_data
+from app.services.digest_schedule import DEFAULT_FREQUENCY, FREQUENCIES
 from app.services.email_service import EmailClient
-from app.services.menu_matcher import run_menu_check_for_all_users, run_menu_check_for_user
-from app.services.nutrislice_client import normalize_item_name
+from app.services.menu_matcher import (
+    FavoriteMatch,
+    cached_menus,
+    parse_shard,
+    run_menu_check_for_all_users,
+    run_menu_check_for_user,
+    warm_menus,
+)
+from app.services.metrics import METRICS
+from app.services.nutrislice_client import CircuitBreaker, NutrisliceUnavailable, normalize_item_name
 
 load_dotenv()
 logging.basicConfig(level=logging.INFO)
@@ -42,10 +58,26 @@ def create_app(test_config: dict | None = None) -> Flask:
             smtp_user=app.config["SMTP_USER"],
             smtp_password=app.config["SMTP_PASSWORD"],
             from_email=app.config["FROM_EMAIL"],
+            messages_per_connection=app.config["SMTP_MESSAGES_PER_CONNECTION"],
+            max_per_second=app.config["SMTP_MAX_PER_SECOND"],
         )
 
+    app.extensions["nutrislice_breaker"] = CircuitBreaker(
+        app.config["NUTRISLICE_BREAKER_THRESHOLD"], app.config["NUTRISLICE_BREAKER_RESET_SECONDS"]
+    )
+    app.extensions["menu_autocomplete"] = MenuAutocomplete(
+        app, app.config["AUTOCOMPLETE_MAX_NAMES"], app.config["AUTOCOMPLETE_REFRESH_SECONDS"]
+    )
+    app.extensions["dashboard_cache"] = DashboardCache(
+        app.config["DASHBOARD_CACHE_TTL_SECONDS"], max_entries=app.config["DASHBOARD_CACHE_SIZE"]
+    )
+    app.extensions["check_queue"] = ManualCheckQueue(
+        app, _run_manual_check, max_workers=app.config["MANUAL_CHECK_WORKERS"]
+    )
+
     with app.app_context():
         db.create_all()
+        run_migrations()
 
     register_routes(app)
     register_cli(app)
@@ -53,18 +85,36 @@ def create_app(test_config: dict | None = None) -> Flask:
 
 
 def current_user() -> User | None:
-    uid = session.get("user_id")
-    if not uid:
-        return None
-    return User.query.get(uid)
+    """Return the signed-in user, loading it at most once per request."""
+    if "current_user" not in g:
+        uid = session.get("user_id")
+        g.current_user = db.session.get(User, uid) if uid else None
+    return g.current_user
+
+
+def _run_manual_check(user_id: int) -> list[FavoriteMatch]:
+    """Background job body for the dashboard "check menus now" button.
+
+    Errors propagate so the queue marks the job failed instead of reporting
+    zero matches. ``last_checked_at`` records when the check started, so a
+    favorite added while it runs is still new to the next incremental scan.
+    """
+    started_at = datetime.utcnow()
+    matches = run_menu_check_for_user(user_id, send_email=True, raise_errors=True)
+    user = db.session.get(User, user_id)
+    if user:
+        user.last_checked_at = started_at
+        invalidate_dashboard(user_id)
+        db.session.commit()
+    return matches
 
 
 def _seed_demo_user(demo_user: User) -> None:
     """Seed default visual data so recruiters can explore an interesting dashboard."""
-    if not demo_user.dining_halls:
-        demo_user.dining_halls = ",".join(DEFAULT_DINING_HALLS[:3])
-    if not demo_user.meals:
-        demo_user.meals = ",".join(DEFAULT_MEALS)
+    if not demo_user.dining_hall_preferences:
+        demo_user.set_dining_halls(DEFAULT_DINING_HALLS[:3])
+    if not demo_user.meal_preferences:
+        demo_user.set_meals(DEFAULT_MEALS)
     if not demo_user.notification_frequency:
         demo_user.notification_frequency = "once_per_day"
 
@@ -98,12 +148,9 @@ def register_routes(app: Flask) -> None:
         demo_user = User.query.filter_by(email=DEMO_EMAIL).first()
 
         if not demo_user:
-            demo_user = User(
-                email=DEMO_EMAIL,
-                dining_halls=",".join(DEFAULT_DINING_HALLS[:3]),
-                meals=",".join(DEFAULT_MEALS),
-                notification_frequency="once_per_day",
-            )
+            demo_user = User(email=DEMO_EMAIL, notification_frequency="once_per_day")
+            demo_user.set_dining_halls(DEFAULT_DINING_HALLS[:3])
+            demo_user.set_meals(DEFAULT_MEALS)
             # Recruiter/demo account: this user can be auto-logged in to showcase the product UX.
             # We still set a password hash so the account is structurally identical to normal users.
             demo_user.set_password("demo-account-safe-default")
@@ -111,6 +158,7 @@ def register_routes(app: Flask) -> None:
             db.session.flush()
 
         _seed_demo_user(demo_user)
+        invalidate_dashboard(demo_user.id)
         db.session.commit()
 
         # This route is intentionally passwordless only for the single demo account above.
@@ -176,6 +224,7 @@ def register_routes(app: Flask) -> None:
                             normalized_name=normalize_item_name(item),
                         )
                     )
+                    invalidate_dashboard(user.id)
                     db.session.commit()
                     flash("Favorite added.", "success")
                 else:
@@ -185,45 +234,155 @@ def register_routes(app: Flask) -> None:
                 favorite = Favorite.query.filter_by(id=fav_id, user_id=user.id).first()
                 if favorite:
                     db.session.delete(favorite)
+                    # Drop stored matches that no remaining favorite explains, so
+                    # incremental scans never need to revisit deletions.
+                    still_favorited = Favorite.query.filter(
+                        Favorite.user_id == user.id,
+                        Favorite.id != favorite.id,
+                        Favorite.item_name == favorite.item_name,
+                    ).first()
+                    if not still_favorited:
+                        MenuMatch.query.filter_by(
+                            user_id=user.id, favorite_item_name=favorite.item_name
+                        ).delete(synchronize_session=False)
+                    invalidate_dashboard(user.id)
                     db.session.commit()
                     flash("Favorite removed.", "info")
             elif action == "update_preferences":
                 halls = request.form.getlist("dining_halls")
                 meals = request.form.getlist("meals")
-                frequency = request.form.get("notification_frequency", "once_per_day")
-                user.dining_halls = ",".join(halls)
-                user.meals = ",".join(meals)
+                frequency = request.form.get("notification_frequency", DEFAULT_FREQUENCY)
+                if frequency not in FREQUENCIES:
+                    frequency = DEFAULT_FREQUENCY
+                user.set_dining_halls(halls)
+                user.set_meals(meals)
                 user.notification_frequency = frequency
+                user.preferences_updated_at = datetime.utcnow()
                 db.session.commit()
                 flash("Preferences updated.", "success")
             elif action == "manual_check":
-                matches = run_menu_check_for_user(user.id, send_email=True)
-                user.last_checked_at = datetime.utcnow()
-                db.session.commit()
-                flash(f"Manual check complete. Found {len(matches)} matches.", "success")
+                _, started = app.extensions["check_queue"].submit(user.id)
+                if started:
+                    flash("Menu check started. Results will appear here shortly.", "info")
+                else:
+                    flash("A menu check is already running for your account.", "info")
             return redirect(url_for("dashboard"))
 
-        favorites = Favorite.query.filter_by(user_id=user.id).order_by(Favorite.created_at.desc()).all()
-        upcoming_matches = (
-            MenuMatch.query.filter_by(user_id=user.id)
-            .order_by(MenuMatch.menu_date.asc(), MenuMatch.created_at.desc())
-            .limit(25)
-            .all()
+        data = app.extensions["dashboard_cache"].get(
+            user.id, user.dashboard_version, date.today(), load_dashboard_data
         )
 
         return render_template(
             "dashboard.html",
             user=user,
-            favorites=favorites,
+            favorites=data.favorites,
             dining_halls_options=DEFAULT_DINING_HALLS,
             meal_options=DEFAULT_MEALS,
-            upcoming_matches=upcoming_matches,
+            upcoming_matches=data.upcoming_matches,
+            check_job=app.extensions["check_queue"].status(user.id),
         )
 
+    @app.get("/dashboard/check-status")
+    def check_status():
+        user = current_user()
+        if not user:
+            return jsonify({"error": "login required"}), 401
+        job = app.extensions["check_queue"].status(user.id)
+        if job is None:
+            return jsonify({"status": "idle"})
+        return jsonify(job.to_dict())
+
+    @app.get("/api/menus")
+    def api_menus():
+        try:
+            target_date = date.fromisoformat(request.args["date"]) if request.args.get("date") else date.today()
+        except ValueError:
+            return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+        hall = request.args.get("hall")
+        meal = request.args.get("meal")
+        try:
+            snapshot = cached_menus(
+                target_date, halls=[hall] if hall else DEFAULT_DINING_HALLS, meals=[meal] if meal else None
+            )
+        except NutrisliceUnavailable:
+            return jsonify({"error": "menus have not been fetched yet"}), 503
+
+        menus: dict[tuple[str, str], list[str]] = {}
+        for location, _, items in snapshot.iter_menus():
+            for item in items:
+                menus.setdefault((location["name"], item.meal), []).append(item.name)
+        response = jsonify(
+            {
+                "date": target_date.isoformat(),
+                "menus": [
+                    {"dining_hall": dining_hall, "meal": meal_name, "items": names}
+                    for (dining_hall, meal_name), names in menus.items()
+                ],
+            }
+        )
+        response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config["MENU_API_MAX_AGE_SECONDS"]
+        return response.make_conditional(request)
+
+    @app.get("/api/favorites/autocomplete")
+    def favorite_autocomplete():
+        limit = max(1, min(request.args.get("limit", 10, type=int), 25))
+        suggestions = app.extensions["menu_autocomplete"].suggest(request.args.get("q", ""), limit)
+        response = jsonify({"suggestions": suggestions})
+        response.cache_control.public = True
+        response.cache_control.max_age = 60
+        return response
+
+    @app.get("/metrics")
+    def metrics():
+        return Response(METRICS.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+def write_run_report(path: str, summary: dict) -> None:
+    """Write a menu check summary and the process metrics as JSON; ``-`` means stdout."""
+    report = json.dumps({"summary": summary, "metrics": METRICS.snapshot()}, indent=2, default=str)
+    if path == "-":
+        print(report)
+        return
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(report + "\n")
+
+
+def _shard_option(ctx: click.Context, param: click.Parameter, value: str | None) -> tuple[int, int] | None:
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc)) from exc
+
 
 def register_cli(app: Flask) -> None:
     @app.cli.command("run_menu_check")
-    def run_menu_check_command() -> None:
+    @click.option("--incremental", is_flag=True, help="Only re-match menus and favorites that changed.")
+    @click.option("--report", metavar="PATH", help="Write a JSON run report with stage timings and metrics.")
+    @click.option("--workers", type=click.IntRange(min=1), help="Match users in this many processes.")
+    @click.option("--shard", callback=_shard_option, metavar="I/N", help="Only scan users whose id is I modulo N.")
+    def run_menu_check_command(
+        incremental: bool, report: str | None, workers: int | None, shard: tuple[int, int] | None
+    ) -> None:
         """CLI entry point for cron-triggered checks."""
-        summary = run_menu_check_for_all_users(send_email=True)
+        summary = run_menu_check_for_all_users(
+            send_email=True,
+            incremental=incremental,
+            workers=workers or app.config["SCAN_WORKERS"],
+            shard=shard,
+        )
         print(f"Menu check complete: {summary}")
+        if report:
+            write_run_report(report, summary)
+
+    @app.cli.command("warm_menus")
+    @click.option("--report", metavar="PATH", help="Write the warm-up summary as JSON.")
+    def warm_menus_command(report: str | None) -> None:
+        """Pre-fetch the lookahead window for every default dining hall into the menu cache."""
+        summary = warm_menus(DEFAULT_DINING_HALLS)
+        print(f"Menu warm-up complete: {summary}")
+        if report:
+            write_run_report(report, summary)
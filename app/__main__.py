@@ -2,20 +2,40 @@
 
 import argparse
 
-from app import create_app
-from app.services.menu_matcher import run_menu_check_for_all_users
+from app import DEFAULT_DINING_HALLS, create_app, write_run_report
+from app.services.menu_matcher import parse_shard, run_menu_check_for_all_users, warm_menus
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="UW Dining Menu Alerts utilities")
-    parser.add_argument("command", choices=["run_menu_check"])
+    parser.add_argument("command", choices=["run_menu_check", "warm_menus"])
+    parser.add_argument(
+        "--incremental", action="store_true", help="Only re-match menus and favorites that changed."
+    )
+    parser.add_argument("--workers", type=int, help="Match users in this many processes.")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N", help="Only scan users whose id is I modulo N.")
+    parser.add_argument(
+        "--report", metavar="PATH", help="Write a JSON run report with stage timings and metrics ('-' for stdout)."
+    )
     args = parser.parse_args()
 
     flask_app = create_app()
     with flask_app.app_context():
         if args.command == "run_menu_check":
-            summary = run_menu_check_for_all_users(send_email=True)
+            summary = run_menu_check_for_all_users(
+                send_email=True,
+                incremental=args.incremental,
+                workers=args.workers or flask_app.config["SCAN_WORKERS"],
+                shard=args.shard,
+            )
             print(summary)
+            if args.report:
+                write_run_report(args.report, summary)
+        elif args.command == "warm_menus":
+            summary = warm_menus(DEFAULT_DINING_HALLS)
+            print(summary)
+            if args.report:
+                write_run_report(args.report, summary)
 
 
 if __name__ == "__main__":
@@ -15,5 +15,30 @@ class Config:
     SMTP_USER = os.getenv("SMTP_USER", "")
     SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
     FROM_EMAIL = os.getenv("FROM_EMAIL", "")
+    SMTP_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MESSAGES_PER_CONNECTION", "50"))
+    SMTP_MAX_PER_SECOND = float(os.getenv("SMTP_MAX_PER_SECOND", "0"))
 
     MENU_LOOKAHEAD_DAYS = int(os.getenv("MENU_LOOKAHEAD_DAYS", "3"))
+    NUTRISLICE_BASE_URL = os.getenv("NUTRISLICE_BASE_URL", "https://wisc-housingdining.nutrislice.com")
+    NUTRISLICE_MAX_WORKERS = int(os.getenv("NUTRISLICE_MAX_WORKERS", "4"))
+    NUTRISLICE_TIMEOUT_SECONDS = float(os.getenv("NUTRISLICE_TIMEOUT_SECONDS", "10"))
+    NUTRISLICE_RETRIES = int(os.getenv("NUTRISLICE_RETRIES", "2"))
+    NUTRISLICE_BACKOFF_SECONDS = float(os.getenv("NUTRISLICE_BACKOFF_SECONDS", "0.5"))
+    NUTRISLICE_BREAKER_THRESHOLD = int(os.getenv("NUTRISLICE_BREAKER_THRESHOLD", "5"))
+    NUTRISLICE_BREAKER_RESET_SECONDS = float(os.getenv("NUTRISLICE_BREAKER_RESET_SECONDS", "60"))
+    MENU_CACHE_TTL_SECONDS = int(os.getenv("MENU_CACHE_TTL_SECONDS", str(6 * 60 * 60)))
+    MENU_API_MAX_AGE_SECONDS = int(os.getenv("MENU_API_MAX_AGE_SECONDS", "300"))
+    AUTOCOMPLETE_MAX_NAMES = int(os.getenv("AUTOCOMPLETE_MAX_NAMES", "20000"))
+    AUTOCOMPLETE_REFRESH_SECONDS = float(os.getenv("AUTOCOMPLETE_REFRESH_SECONDS", "60"))
+    SCAN_CHUNK_SIZE = int(os.getenv("SCAN_CHUNK_SIZE", "500"))
+    SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "1"))
+    FUZZY_MATCHING = os.getenv("FUZZY_MATCHING", "false").lower() == "true"
+    FUZZY_MIN_SCORE = float(os.getenv("FUZZY_MIN_SCORE", "0.8"))
+    FUZZY_MIN_TOKEN_SIMILARITY = float(os.getenv("FUZZY_MIN_TOKEN_SIMILARITY", "0.6"))
+    FUZZY_CANDIDATE_OVERLAP = float(os.getenv("FUZZY_CANDIDATE_OVERLAP", "0.4"))
+    DIGEST_MORNING_HOUR_UTC = int(os.getenv("DIGEST_MORNING_HOUR_UTC", "12"))
+    DIGEST_WEEKLY_WEEKDAY = int(os.getenv("DIGEST_WEEKLY_WEEKDAY", "0"))
+    MANUAL_CHECK_WORKERS = int(os.getenv("MANUAL_CHECK_WORKERS", "2"))
+    DASHBOARD_CACHE_TTL_SECONDS = int(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "60"))
+    DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "1024"))
+    DASHBOARD_URL = os.getenv("DASHBOARD_URL", "http://localhost:5000/dashboard")
@@ -0,0 +1,135 @@
+"""In-place schema upgrades for databases created by older releases.
+
+``db.create_all()`` only creates missing tables, so changes to existing
+tables are applied here. Every step is idempotent and runs at startup.
+"""
+
+from __future__ import annotations
+
+import logging
+
+from sqlalchemy import inspect, text
+
+from app.models import MenuMatch, MenuVersion, UserDiningHall, UserMeal, db
+from app.services.favorite_index import favorite_lookup_key
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _split(value: str | None) -> list[str]:
+    return [item for item in dict.fromkeys((value or "").split(",")) if item]
+
+
+def migrate_preference_columns() -> None:
+    """Move legacy comma-joined ``user.dining_halls``/``user.meals`` into association rows."""
+    columns = {column["name"] for column in inspect(db.engine).get_columns("user")}
+    if not {"dining_halls", "meals"} <= columns:
+        return
+
+    rows = db.session.execute(
+        text(
+            'SELECT id, dining_halls, meals FROM "user" '
+            "WHERE COALESCE(dining_halls, '') != '' OR COALESCE(meals, '') != ''"
+        )
+    ).all()
+    for user_id, dining_halls, meals in rows:
+        db.session.add_all(
+            UserDiningHall(user_id=user_id, dining_hall=hall, position=position)
+            for position, hall in enumerate(_split(dining_halls))
+        )
+        db.session.add_all(
+            UserMeal(user_id=user_id, meal=meal, position=position)
+            for position, meal in enumerate(_split(meals))
+        )
+    if rows:
+        db.session.execute(text("""UPDATE "user" SET dining_halls = '', meals = ''"""))
+        LOGGER.info("Migrated dining hall and meal preferences for %s users", len(rows))
+    db.session.commit()
+
+
+def _add_missing_columns(table: str, columns: dict[str, str]) -> None:
+    existing = {column["name"] for column in inspect(db.engine).get_columns(table)}
+    for name, ddl_type in columns.items():
+        if name not in existing:
+            db.session.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {name} {ddl_type}'))
+    db.session.commit()
+
+
+def migrate_menu_match_dedup() -> None:
+    """Add ``menu_match.notified_at`` and the unique match identity index."""
+    columns = {column["name"] for column in inspect(db.engine).get_columns("menu_match")}
+    if "notified_at" not in columns:
+        db.session.execute(text("ALTER TABLE menu_match ADD COLUMN notified_at TIMESTAMP"))
+        # Matches stored before dedup existed were already emailed (or never will be).
+        db.session.execute(text("UPDATE menu_match SET notified_at = created_at"))
+
+    indexes = {index["name"] for index in inspect(db.engine).get_indexes("menu_match")}
+    if "uq_menu_match_identity" not in indexes:
+        identity = ", ".join(MenuMatch.IDENTITY_COLUMNS)
+        db.session.execute(
+            text(f"DELETE FROM menu_match WHERE id NOT IN (SELECT MIN(id) FROM menu_match GROUP BY {identity})")
+        )
+        db.session.execute(text(f"CREATE UNIQUE INDEX uq_menu_match_identity ON menu_match ({identity})"))
+    db.session.commit()
+
+
+def migrate_favorite_lookup_keys() -> None:
+    """Add and backfill ``favorite.lookup_key`` for the reverse favorite lookup."""
+    columns = {column["name"] for column in inspect(db.engine).get_columns("favorite")}
+    if "lookup_key" not in columns:
+        db.session.execute(text("ALTER TABLE favorite ADD COLUMN lookup_key VARCHAR(3)"))
+        rows = db.session.execute(text("SELECT id, normalized_name FROM favorite")).all()
+        if rows:
+            db.session.execute(
+                text("UPDATE favorite SET lookup_key = :key WHERE id = :id"),
+                [{"id": favorite_id, "key": favorite_lookup_key(name or "")} for favorite_id, name in rows],
+            )
+            LOGGER.info("Backfilled lookup keys for %s favorites", len(rows))
+    db.session.commit()
+
+
+def migrate_menu_version_shards() -> None:
+    """Key ``menu_version`` by scan shard.
+
+    The hashes are only a change watermark, so the table is recreated rather
+    than rebuilt; the next incremental scan treats every menu as changed.
+    """
+    columns = {column["name"] for column in inspect(db.engine).get_columns("menu_version")}
+    if "shard" in columns:
+        return
+    MenuVersion.__table__.drop(db.engine)
+    MenuVersion.__table__.create(db.engine)
+    LOGGER.info("Recreated menu_version with per-shard menu hashes")
+
+
+def _create_missing_indexes(table: str, indexes: dict[str, tuple[str, ...]]) -> None:
+    existing = {index["name"] for index in inspect(db.engine).get_indexes(table)}
+    for name, columns in indexes.items():
+        if name not in existing:
+            db.session.execute(text(f'CREATE INDEX {name} ON "{table}" ({", ".join(columns)})'))
+    db.session.commit()
+
+
+def run_migrations() -> None:
+    migrate_preference_columns()
+    migrate_menu_match_dedup()
+    _add_missing_columns(
+        "user",
+        {
+            "preferences_updated_at": "TIMESTAMP",
+            "last_notified_at": "TIMESTAMP",
+            "dashboard_version": "INTEGER NOT NULL DEFAULT 0",
+        },
+    )
+    migrate_favorite_lookup_keys()
+    migrate_menu_version_shards()
+    _create_missing_indexes(
+        "favorite",
+        {
+            "ix_favorite_user_created": ("user_id", "created_at"),
+            "ix_favorite_lookup_key": ("lookup_key",),
+            "ix_favorite_created": ("created_at",),
+        },
+    )
+    _create_missing_indexes("user", {"ix_user_preferences_updated": ("preferences_updated_at",)})
+    _create_missing_indexes("menu_match", {"ix_menu_match_user_date": ("user_id", "menu_date")})
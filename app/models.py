@@ -5,6 +5,8 @@ from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import check_password_hash, generate_password_hash
 
+from app.services.favorite_index import favorite_lookup_key
+
 
 db = SQLAlchemy()
 
@@ -15,15 +17,24 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
-    dining_halls = db.Column(db.Text, default="")
-    meals = db.Column(db.Text, default="")
     notification_frequency = db.Column(db.String(50), default="once_per_day")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_checked_at = db.Column(db.DateTime, nullable=True)
+    last_notified_at = db.Column(db.DateTime, nullable=True)
+    preferences_updated_at = db.Column(db.DateTime, nullable=True)
+    dashboard_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (db.Index("ix_user_preferences_updated", "preferences_updated_at"),)
 
     favorites = db.relationship(
         "Favorite", backref="user", cascade="all, delete-orphan", lazy=True
     )
+    dining_hall_preferences = db.relationship(
+        "UserDiningHall", cascade="all, delete-orphan", lazy=True, order_by="UserDiningHall.position"
+    )
+    meal_preferences = db.relationship(
+        "UserMeal", cascade="all, delete-orphan", lazy=True, order_by="UserMeal.position"
+    )
 
     def set_password(self, password: str) -> None:
         self.password_hash = generate_password_hash(password, method="pbkdf2:sha256")
@@ -32,21 +43,62 @@ class User(db.Model):
         return check_password_hash(self.password_hash, password)
 
     def dining_halls_list(self) -> list[str]:
-        return [item for item in self.dining_halls.split(",") if item]
+        return [pref.dining_hall for pref in self.dining_hall_preferences]
 
     def meals_list(self) -> list[str]:
-        return [item for item in self.meals.split(",") if item]
+        return [pref.meal for pref in self.meal_preferences]
+
+    def set_dining_halls(self, halls: list[str]) -> None:
+        unique = [hall for hall in dict.fromkeys(halls) if hall]
+        self.dining_hall_preferences = [
+            UserDiningHall(dining_hall=hall, position=position) for position, hall in enumerate(unique)
+        ]
+
+    def set_meals(self, meals: list[str]) -> None:
+        unique = [meal for meal in dict.fromkeys(meals) if meal]
+        self.meal_preferences = [UserMeal(meal=meal, position=position) for position, meal in enumerate(unique)]
+
+
+class UserDiningHall(db.Model):
+    """A dining hall a user wants alerts for; no rows means every hall."""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    dining_hall = db.Column(db.String(255), primary_key=True, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+
+class UserMeal(db.Model):
+    """A meal a user wants alerts for; no rows means every meal."""
+
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    meal = db.Column(db.String(255), primary_key=True, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+
+def _default_lookup_key(context) -> str:
+    return favorite_lookup_key(context.get_current_parameters()["normalized_name"])
 
 
 class Favorite(db.Model):
-    """User favorite menu item by free text name."""
+    """User favorite menu item by free text name.
+
+    ``lookup_key`` is a short piece of ``normalized_name`` (see
+    ``favorite_lookup_key``) that reverse-indexes favorites by what a menu
+    must contain to match them.
+    """
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
     item_name = db.Column(db.String(255), nullable=False)
     normalized_name = db.Column(db.String(255), nullable=False, index=True)
+    lookup_key = db.Column(db.String(3), nullable=False, default=_default_lookup_key, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index("ix_favorite_user_created", "user_id", "created_at"),
+        db.Index("ix_favorite_created", "created_at"),
+    )
+
 
 class MenuMatch(db.Model):
     """A discovered menu match for a user."""
@@ -59,3 +111,53 @@ class MenuMatch(db.Model):
     meal = db.Column(db.String(255), nullable=True)
     menu_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    notified_at = db.Column(db.DateTime, nullable=True)
+
+    IDENTITY_COLUMNS = ("user_id", "favorite_item_name", "menu_item_name", "dining_hall", "meal", "menu_date")
+
+    __table_args__ = (
+        db.Index("uq_menu_match_identity", *IDENTITY_COLUMNS, unique=True),
+        db.Index("ix_menu_match_user_date", "user_id", "menu_date"),
+    )
+
+
+class MenuCacheEntry(db.Model):
+    """Cached Nutrislice response body, keyed by its API resource path."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(255), unique=True, nullable=False)
+    location_id = db.Column(db.Integer, nullable=True)
+    menu_type_id = db.Column(db.Integer, nullable=True)
+    week_start = db.Column(db.Date, nullable=True)
+    payload = db.Column(db.Text, nullable=False)
+    etag = db.Column(db.String(255), nullable=True)
+    last_modified = db.Column(db.String(255), nullable=True)
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.Index("ix_menu_cache_week", "location_id", "menu_type_id", "week_start"),)
+
+
+class MenuVersion(db.Model):
+    """Content hash of the last scanned menu for a location and date.
+
+    Each scan shard keeps its own hashes under ``shard`` (``"I/N"``, or ``""``
+    for unsharded scans), so one shard recording a change never hides it
+    from another.
+    """
+
+    shard = db.Column(db.String(16), primary_key=True, default="")
+    location_id = db.Column(db.Integer, primary_key=True)
+    menu_date = db.Column(db.Date, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ScanWatermark(db.Model):
+    """When the last completed incremental scan of a shard started (``""`` when unsharded).
+
+    That scan re-matched every favorite and preference changed before then,
+    so the next one only looks for changes since.
+    """
+
+    shard = db.Column(db.String(16), primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,177 @@
+"""Autocomplete of favorite names from the menu items Nutrislice has served."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+import heapq
+import json
+import logging
+import threading
+import time
+from typing import Iterable
+
+from flask import Flask
+from sqlalchemy.orm import Session
+
+from app.models import MenuCacheEntry, db
+from app.services.nutrislice_client import iter_week_items, normalize_item_name
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_SCANNED_ENTRIES = 200
+REFRESH_OVERLAP = timedelta(minutes=10)
+
+
+def _word_suffixes(normalized_name: str) -> list[str]:
+    """Return the name from each word onward, so "tikka" finds "chicken tikka masala"."""
+    words = normalized_name.split()
+    return [" ".join(words[index:]) for index in range(len(words))]
+
+
+class PrefixIndex:
+    """Sorted prefix index over distinct normalized menu names.
+
+    Each name is indexed from the start of every word. Lookups bisect an
+    immutable ``(keys, names)`` pair, so readers never lock; ``add`` merges
+    new names into a fresh pair under a writer lock and swaps it in. At most
+    ``max_names`` names are kept, dropping those last seen on the oldest
+    menu date first.
+    """
+
+    def __init__(self, max_names: int = 20000):
+        self.max_names = max_names
+        self._write_lock = threading.Lock()
+        self._seen: dict[str, tuple[str, date]] = {}
+        self._index: tuple[list[str], list[str]] = ([], [])
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, items: Iterable[tuple[str, str, date]]) -> int:
+        """Index ``(normalized_name, display_name, menu_date)`` items; returns how many names were new."""
+        with self._write_lock:
+            new: dict[str, None] = {}
+            for normalized_name, display_name, menu_date in items:
+                if not normalized_name:
+                    continue
+                known = self._seen.get(normalized_name)
+                if known is None:
+                    new[normalized_name] = None
+                    self._seen[normalized_name] = (display_name, menu_date)
+                elif menu_date > known[1]:
+                    self._seen[normalized_name] = (known[0], menu_date)
+
+            evicted: set[str] = set()
+            overflow = len(self._seen) - self.max_names
+            if overflow > 0:
+                evicted = set(heapq.nsmallest(overflow, self._seen, key=lambda name: self._seen[name][1]))
+                for name in evicted:
+                    del self._seen[name]
+            if not new and not evicted:
+                return 0
+
+            keys, names = self._index
+            added = sorted(
+                (suffix, name) for name in new if name not in evicted for suffix in _word_suffixes(name)
+            )
+            merged = [
+                entry for entry in heapq.merge(zip(keys, names), added) if entry[1] not in evicted
+            ]
+            self._index = ([key for key, _ in merged], [name for _, name in merged])
+            return len(new) - len(evicted & new.keys())
+
+    def suggest(self, query: str, limit: int = 10) -> list[str]:
+        """Return display names of up to ``limit`` indexed items with a word starting with ``query``.
+
+        Names are listed once, in key order; at most ``MAX_SCANNED_ENTRIES``
+        index entries are read so lookups stay constant time.
+        """
+        prefix = " ".join(normalize_item_name(query).split())
+        if not prefix or limit <= 0:
+            return []
+        keys, names = self._index
+        suggestions: dict[str, None] = {}
+        start = bisect_left(keys, prefix)
+        for position in range(start, min(start + MAX_SCANNED_ENTRIES, len(keys))):
+            if not keys[position].startswith(prefix):
+                break
+            seen = self._seen.get(names[position])
+            if seen is not None:
+                suggestions[seen[0]] = None
+                if len(suggestions) >= limit:
+                    break
+        return list(suggestions)
+
+
+class MenuAutocomplete:
+    """A ``PrefixIndex`` kept up to date from the persistent menu cache.
+
+    Every process reads the weeks that scans, manual checks and
+    ``warm_menus`` store in ``MenuCacheEntry`` on a daemon thread, started by
+    the first lookup, which refreshes at once and then every
+    ``refresh_seconds``. Lookups only read the index and never wait on it.
+    """
+
+    def __init__(self, app: Flask, max_names: int = 20000, refresh_seconds: float = 60.0):
+        self.app = app
+        self.index = PrefixIndex(max_names)
+        self.refresh_seconds = refresh_seconds
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._loaded_until: datetime | None = None
+        self._loaded: dict[int, datetime] = {}
+
+    def start(self) -> None:
+        """Start the refresh thread unless this process already runs it."""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="menu-autocomplete", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                with self.app.app_context():
+                    self.refresh()
+            except Exception:
+                LOGGER.exception("Autocomplete refresh failed")
+            time.sleep(self.refresh_seconds)
+
+    def refresh(self) -> int:
+        """Index names from cache entries fetched since the last refresh; returns how many were new.
+
+        Entries are re-read from ``REFRESH_OVERLAP`` before the newest one
+        already loaded, so a write committed after a later-stamped one is
+        still picked up. Entries already read at the same ``fetched_at`` are
+        skipped.
+        """
+        with self._refresh_lock, Session(db.engine) as session:
+            query = session.query(MenuCacheEntry.id, MenuCacheEntry.fetched_at).filter(
+                MenuCacheEntry.week_start.isnot(None)
+            )
+            if self._loaded_until is not None:
+                query = query.filter(MenuCacheEntry.fetched_at > self._loaded_until - REFRESH_OVERLAP)
+            versions = dict(query.all())
+            changed = [
+                entry_id for entry_id, fetched_at in versions.items() if self._loaded.get(entry_id) != fetched_at
+            ]
+            if versions:
+                self._loaded_until = max(self._loaded_until or datetime.min, *versions.values())
+            self._loaded = versions
+            if not changed:
+                return 0
+            entries = session.query(MenuCacheEntry).filter(MenuCacheEntry.id.in_(changed)).all()
+            items = (
+                (item.normalized_name, item.name, item.date)
+                for entry in entries
+                for item in iter_week_items(json.loads(entry.payload), entry.location_id, entry.week_start)
+            )
+            return self.index.add(items)
+
+    def suggest(self, query: str, limit: int = 10) -> list[str]:
+        self.start()
+        return self.index.suggest(query, limit)
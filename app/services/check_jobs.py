@@ -0,0 +1,95 @@
+"""Background execution of dashboard-triggered menu checks."""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+import logging
+import threading
+from typing import Callable
+
+from flask import Flask
+
+LOGGER = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class CheckJob:
+    """State of the most recent manual check for one user."""
+
+    user_id: int
+    status: str
+    submitted_at: datetime
+    finished_at: datetime | None = None
+    matches: int | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "submitted_at": self.submitted_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "matches": self.matches,
+        }
+
+
+class ManualCheckQueue:
+    """Runs manual checks on a small thread pool, one active job per user.
+
+    ``check`` is called as ``check(user_id)`` inside an app context and returns
+    the matches found. Submitting while a user's job is queued or running
+    returns the existing job instead of starting another.
+    """
+
+    def __init__(self, app: Flask, check: Callable[[int], list], max_workers: int = 2):
+        self.app = app
+        self.check = check
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="manual-check")
+        self._lock = threading.Lock()
+        self._jobs: dict[int, CheckJob] = {}
+        self._futures: dict[int, Future] = {}
+
+    def submit(self, user_id: int) -> tuple[CheckJob, bool]:
+        """Queue a check for ``user_id``; the flag is ``False`` when coalesced into a running job."""
+        with self._lock:
+            job = self._jobs.get(user_id)
+            if job is not None and job.active:
+                return job, False
+            job = CheckJob(user_id=user_id, status=QUEUED, submitted_at=datetime.utcnow())
+            self._jobs[user_id] = job
+            self._futures[user_id] = self._executor.submit(self._run, job)
+            return job, True
+
+    def status(self, user_id: int) -> CheckJob | None:
+        with self._lock:
+            return self._jobs.get(user_id)
+
+    def wait(self, user_id: int, timeout: float | None = None) -> CheckJob | None:
+        """Block until the user's current job finishes."""
+        future = self._futures.get(user_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.status(user_id)
+
+    def _run(self, job: CheckJob) -> None:
+        job.status = RUNNING
+        with self.app.app_context():
+            try:
+                matches = self.check(job.user_id)
+            except Exception:
+                LOGGER.exception("Manual check failed for user_id=%s", job.user_id)
+                job.status = FAILED
+            else:
+                job.matches = len(matches)
+                job.status = DONE
+            finally:
+                job.finished_at = datetime.utcnow()
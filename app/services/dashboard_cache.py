@@ -0,0 +1,129 @@
+"""Short-lived per-user cache of the dashboard's favorites and upcoming matches."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import update
+
+from app.models import Favorite, MenuMatch, User, db
+from app.services.metrics import METRICS
+
+UPCOMING_MATCH_LIMIT = 25
+
+
+@dataclass(frozen=True, slots=True)
+class FavoriteView:
+    id: int
+    item_name: str
+
+
+@dataclass(frozen=True, slots=True)
+class MatchView:
+    favorite_item_name: str
+    menu_item_name: str
+    dining_hall: str
+    meal: str | None
+    menu_date: date
+
+
+@dataclass(frozen=True)
+class DashboardData:
+    """What the dashboard lists for one user, detached from any session."""
+
+    favorites: tuple[FavoriteView, ...]
+    upcoming_matches: tuple[MatchView, ...]
+
+
+def load_dashboard_data(user_id: int, today: date, limit: int = UPCOMING_MATCH_LIMIT) -> DashboardData:
+    """Query favorites newest first and the next ``limit`` matches from ``today`` on.
+
+    Both queries are served by the ``(user_id, created_at)`` and
+    ``(user_id, menu_date)`` indexes, so their cost does not grow with the
+    user's past matches.
+    """
+    favorites = db.session.execute(
+        db.select(Favorite.id, Favorite.item_name)
+        .where(Favorite.user_id == user_id)
+        .order_by(Favorite.created_at.desc())
+    ).all()
+    matches = db.session.execute(
+        db.select(
+            MenuMatch.favorite_item_name,
+            MenuMatch.menu_item_name,
+            MenuMatch.dining_hall,
+            MenuMatch.meal,
+            MenuMatch.menu_date,
+        )
+        .where(MenuMatch.user_id == user_id, MenuMatch.menu_date >= today)
+        .order_by(MenuMatch.menu_date.asc(), MenuMatch.created_at.desc())
+        .limit(limit)
+    ).all()
+    return DashboardData(
+        favorites=tuple(FavoriteView(*row) for row in favorites),
+        upcoming_matches=tuple(MatchView(*row) for row in matches),
+    )
+
+
+def invalidate_dashboard(user_id: int) -> None:
+    """Bump the user's ``dashboard_version`` so every process's cached copy goes stale.
+
+    Runs in the caller's transaction; commit it with the change it reflects.
+    """
+    db.session.execute(
+        update(User).where(User.id == user_id).values(dashboard_version=User.dashboard_version + 1)
+    )
+
+
+class DashboardCache:
+    """LRU of ``DashboardData`` per user with a TTL.
+
+    Entries are tagged with the ``User.dashboard_version`` read before they
+    were loaded, and only served for that version. Any process changing a
+    user's favorites or matches calls ``invalidate_dashboard``, which bumps
+    the version in the database, so every web worker sees the change on its
+    next request; data loaded while the version changed is stored under the
+    old one and never served. The TTL bounds staleness after scans in other
+    processes store matches. Entries are also keyed by the day they were
+    loaded for, so matches drop off once their date has passed.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 1024):
+        self.ttl = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, tuple[int, date, float, DashboardData]] = OrderedDict()
+
+    def get(
+        self, user_id: int, version: int, today: date, load: Callable[[int, date], DashboardData]
+    ) -> DashboardData:
+        """Return the user's data for ``version`` (read before calling), loading it on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version and entry[1] == today and entry[2] > now:
+                self._entries.move_to_end(user_id)
+                METRICS.inc("dashboard_cache_lookups_total", outcome="hit")
+                return entry[3]
+
+        METRICS.inc("dashboard_cache_lookups_total", outcome="miss")
+        data = load(user_id, today)
+        if self.ttl > 0:
+            with self._lock:
+                entry = self._entries.get(user_id)
+                if entry is not None and entry[0] > version:
+                    return data
+                self._entries[user_id] = (version, today, now + self.ttl, data)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return data
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,70 @@
+"""When each notification frequency's alert digest is due."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from sqlalchemy import and_, or_
+
+from app.models import User
+
+INSTANT = "instant"
+EVERY_MORNING = "every_morning"
+ONCE_PER_DAY = "once_per_day"
+WEEKLY = "weekly"
+FREQUENCIES = (INSTANT, EVERY_MORNING, ONCE_PER_DAY, WEEKLY)
+DEFAULT_FREQUENCY = ONCE_PER_DAY
+
+
+@dataclass(frozen=True)
+class DigestSchedule:
+    """Digest windows per notification frequency, in UTC.
+
+    ``instant`` users are due on every run. ``once_per_day`` windows start at
+    midnight, ``every_morning`` windows at ``morning_hour`` and weekly ones at
+    ``morning_hour`` on ``weekly_weekday`` (0 is Monday). A user is due once
+    per window: when they have pending matches and have not been emailed
+    since the current window started. Unknown frequencies count as the
+    default.
+    """
+
+    morning_hour: int = 12
+    weekly_weekday: int = 0
+
+    def window_start(self, frequency: str | None, now: datetime) -> datetime | None:
+        """Return when the window containing ``now`` began, ``None`` for instant alerts."""
+        if frequency not in FREQUENCIES:
+            frequency = DEFAULT_FREQUENCY
+        if frequency == INSTANT:
+            return None
+        if frequency == ONCE_PER_DAY:
+            return datetime.combine(now.date(), time())
+        period = timedelta(days=7 if frequency == WEEKLY else 1)
+        start = datetime.combine(now.date(), time(self.morning_hour))
+        if frequency == WEEKLY:
+            start -= timedelta(days=(now.weekday() - self.weekly_weekday) % 7)
+        return start - period if start > now else start
+
+    def is_due(self, frequency: str | None, last_notified_at: datetime | None, now: datetime) -> bool:
+        start = self.window_start(frequency, now)
+        return start is None or last_notified_at is None or last_notified_at < start
+
+    def due_filter(self, now: datetime):
+        """SQL criterion on ``User`` equivalent to ``is_due`` for every user."""
+        others = [frequency for frequency in FREQUENCIES if frequency != DEFAULT_FREQUENCY]
+        clauses = [User.last_notified_at.is_(None), User.notification_frequency == INSTANT]
+        for frequency in (EVERY_MORNING, WEEKLY):
+            clauses.append(
+                and_(
+                    User.notification_frequency == frequency,
+                    User.last_notified_at < self.window_start(frequency, now),
+                )
+            )
+        clauses.append(
+            and_(
+                or_(User.notification_frequency.is_(None), User.notification_frequency.not_in(others)),
+                User.last_notified_at < self.window_start(DEFAULT_FREQUENCY, now),
+            )
+        )
+        return or_(*clauses)
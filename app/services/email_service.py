@@ -2,16 +2,73 @@
 
 from __future__ import annotations
 
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from functools import lru_cache
 import logging
+from pathlib import Path
 import smtplib
+import time
+from typing import Iterable
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+from app.services.metrics import METRICS
 
 LOGGER = logging.getLogger(__name__)
 
+EMAIL_TEMPLATE_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+MATCH_EMAIL_SUBJECT = "UW–Madison dining alert: your favorites are on the menu"
+
+DigestKey = tuple[date | str, str, str]
+DigestEntries = tuple[tuple[str, str], ...]
+
+
+@dataclass
+class OutgoingEmail:
+    to_email: str
+    subject: str
+    html_body: str
+    text_body: str
+
+
+@dataclass
+class BatchSendResult:
+    """Delivery stats for one ``send_batch`` call."""
+
+    sent: int = 0
+    failed: int = 0
+    connections: int = 0
+    elapsed_seconds: float = 0.0
+    failed_recipients: list[str] = field(default_factory=list)
+
+    def add(self, other: "BatchSendResult") -> None:
+        self.sent += other.sent
+        self.failed += other.failed
+        self.connections += other.connections
+        self.elapsed_seconds += other.elapsed_seconds
+        self.failed_recipients.extend(other.failed_recipients)
+
+    def as_summary(self) -> dict[str, float]:
+        return {
+            "emails_sent": self.sent,
+            "emails_failed": self.failed,
+            "smtp_connections": self.connections,
+            "email_seconds": round(self.elapsed_seconds, 3),
+        }
+
 
 class EmailClient:
-    """SMTP email client for alert notifications."""
+    """SMTP email client for alert notifications.
+
+    ``send_batch`` reuses one authenticated connection for up to
+    ``messages_per_connection`` messages and paces delivery to at most
+    ``max_per_second`` messages (0 disables the limit).
+    """
 
     def __init__(
         self,
@@ -20,70 +77,208 @@ class EmailClient:
         smtp_user: str,
         smtp_password: str,
         from_email: str,
+        messages_per_connection: int = 50,
+        max_per_second: float = 0,
     ):
         self.smtp_host = smtp_host
         self.smtp_port = smtp_port
         self.smtp_user = smtp_user
         self.smtp_password = smtp_password
         self.from_email = from_email
+        self.messages_per_connection = max(1, messages_per_connection)
+        self.max_per_second = max_per_second
 
-    def send_html_email(self, to_email: str, subject: str, html_body: str, text_body: str) -> None:
+    def _build_message(self, email: OutgoingEmail) -> str:
         msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
+        msg["Subject"] = email.subject
         msg["From"] = self.from_email
-        msg["To"] = to_email
-        msg.attach(MIMEText(text_body, "plain"))
-        msg.attach(MIMEText(html_body, "html"))
+        msg["To"] = email.to_email
+        msg.attach(MIMEText(email.text_body, "plain"))
+        msg.attach(MIMEText(email.html_body, "html"))
+        return msg.as_string()
 
-        with smtplib.SMTP(self.smtp_host, self.smtp_port) as server:
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+        try:
             server.starttls()
             if self.smtp_user and self.smtp_password:
                 server.login(self.smtp_user, self.smtp_password)
-            server.sendmail(self.from_email, [to_email], msg.as_string())
-
-
-def build_match_email_content(user_email: str, matches: list[dict], dashboard_url: str) -> tuple[str, str, str]:
-    """Build subject and body for alert emails."""
-    subject = "UW–Madison dining alert: your favorites are on the menu"
-
-    rows = "".join(
-        (
-            "<tr>"
-            f"<td>{match['favorite_item_name']}</td>"
-            f"<td>{match['menu_item_name']}</td>"
-            f"<td>{match['dining_hall']}</td>"
-            f"<td>{match.get('meal') or 'N/A'}</td>"
-            f"<td>{match['menu_date']}</td>"
-            "</tr>"
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    @staticmethod
+    def _disconnect(server: smtplib.SMTP | None) -> None:
+        if server is None:
+            return
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+    def send_html_email(self, to_email: str, subject: str, html_body: str, text_body: str) -> None:
+        email = OutgoingEmail(to_email, subject, html_body, text_body)
+        try:
+            with self._connect() as server:
+                METRICS.inc("smtp_connections_total")
+                with METRICS.timed("smtp_send_seconds"):
+                    server.sendmail(self.from_email, [to_email], self._build_message(email))
+        except Exception:
+            METRICS.inc("smtp_messages_total", outcome="failed")
+            raise
+        METRICS.inc("smtp_messages_total", outcome="sent")
+
+    def send_batch(self, emails: Iterable[OutgoingEmail]) -> BatchSendResult:
+        """Send many emails over reused connections, reconnecting once per failed message."""
+        result = BatchSendResult()
+        started = time.perf_counter()
+        min_interval = 1 / self.max_per_second if self.max_per_second > 0 else 0.0
+        next_send_at = started
+        server: smtplib.SMTP | None = None
+        sent_on_connection = 0
+
+        for email in emails:
+            if min_interval:
+                delay = next_send_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_send_at = max(next_send_at, time.perf_counter()) + min_interval
+
+            message = self._build_message(email)
+            delivered = False
+            for attempt in (1, 2):
+                try:
+                    if server is None or sent_on_connection >= self.messages_per_connection:
+                        self._disconnect(server)
+                        server = None
+                        server = self._connect()
+                        result.connections += 1
+                        METRICS.inc("smtp_connections_total")
+                        sent_on_connection = 0
+                    sent_on_connection += 1
+                    with METRICS.timed("smtp_send_seconds"):
+                        server.sendmail(self.from_email, [email.to_email], message)
+                    delivered = True
+                    break
+                except smtplib.SMTPRecipientsRefused:
+                    LOGGER.warning("SMTP refused recipient %s", email.to_email)
+                    break
+                except (smtplib.SMTPException, OSError):
+                    LOGGER.warning("SMTP send to %s failed (attempt %s)", email.to_email, attempt, exc_info=True)
+                    if server is not None:
+                        server.close()
+                    server = None
+
+            if delivered:
+                result.sent += 1
+            else:
+                result.failed += 1
+                result.failed_recipients.append(email.to_email)
+            METRICS.inc("smtp_messages_total", outcome="sent" if delivered else "failed")
+
+        self._disconnect(server)
+        result.elapsed_seconds = time.perf_counter() - started
+        LOGGER.info(
+            "Sent %s emails (%s failed) over %s SMTP connections in %.2fs",
+            result.sent,
+            result.failed,
+            result.connections,
+            result.elapsed_seconds,
         )
-        for match in matches
+        return result
+
+
+def _format_day(value: date | str) -> str:
+    if isinstance(value, date):
+        return value.strftime("%A, %b %d, %Y")
+    return str(value)
+
+
+def group_matches(matches: Iterable) -> list[tuple[DigestKey, DigestEntries]]:
+    """Group matches into ``((date, hall, meal), ((favorite, menu item), ...))`` digest sections.
+
+    Sections are ordered by date, hall and meal; duplicate entries are dropped.
+    """
+    sections: dict[DigestKey, dict[tuple[str, str], None]] = {}
+    for match in matches:
+        key = (match.menu_date, match.dining_hall, match.meal or "N/A")
+        sections.setdefault(key, {})[(match.favorite_item_name, match.menu_item_name)] = None
+    return [
+        (key, tuple(sorted(entries)))
+        for key, entries in sorted(sections.items(), key=lambda section: (str(section[0][0]), *section[0][1:]))
+    ]
+
+
+@lru_cache(maxsize=None)
+def _email_environment() -> Environment:
+    return Environment(
+        loader=FileSystemLoader(EMAIL_TEMPLATE_DIR),
+        autoescape=select_autoescape(["html"]),
+        trim_blocks=True,
+        lstrip_blocks=True,
+        keep_trailing_newline=False,
     )
 
-    html_body = f"""
-    <p>Hello {user_email},</p>
-    <p>Great news — your favorites are on the UW–Madison dining menu.</p>
-    <table border="1" cellpadding="6" cellspacing="0">
-      <thead>
-        <tr>
-          <th>Favorite</th><th>Menu Item</th><th>Dining Hall</th><th>Meal</th><th>Date</th>
-        </tr>
-      </thead>
-      <tbody>{rows}</tbody>
-    </table>
-    <p>Visit your dashboard for details: <a href="{dashboard_url}">{dashboard_url}</a></p>
+
+class DigestRenderer:
+    """Renders alert digests from templates compiled once per process.
+
+    Each section (one date, hall and meal with its entries) is rendered by
+    the ``section`` macro in ``digest_parts`` and reused when another user
+    has the same matches there. At most ``max_sections`` sections are kept,
+    least recently used first out.
     """
 
-    lines = [
-        f"Hello {user_email},",
-        "",
-        "Your favorites are on the UW-Madison dining menu:",
-    ]
-    for match in matches:
-        lines.append(
-            f"- {match['favorite_item_name']} => {match['menu_item_name']} | "
-            f"{match['dining_hall']} | {match.get('meal') or 'N/A'} | {match['menu_date']}"
+    def __init__(self, max_sections: int = 16384):
+        environment = _email_environment()
+        self._html = environment.get_template("match_digest.html")
+        self._text = environment.get_template("match_digest.txt")
+        self._section_html = environment.get_template("digest_parts.html").module.section
+        self._section_text = environment.get_template("digest_parts.txt").module.section
+        self.max_sections = max_sections
+        self._sections: OrderedDict[tuple[DigestKey, DigestEntries], tuple[Markup, str]] = OrderedDict()
+        self.rendered = 0
+        self.reused = 0
+
+    def _section(self, key: DigestKey, entries: DigestEntries) -> tuple[Markup, str]:
+        cache_key = (key, entries)
+        section = self._sections.get(cache_key)
+        if section is not None:
+            self._sections.move_to_end(cache_key)
+            self.reused += 1
+            return section
+
+        day = _format_day(key[0])
+        section = (
+            Markup(self._section_html(day, *key[1:], entries)),
+            str(self._section_text(day, *key[1:], entries)).rstrip(),
         )
-    lines.append("")
-    lines.append(f"Dashboard: {dashboard_url}")
+        self._sections[cache_key] = section
+        if len(self._sections) > self.max_sections:
+            self._sections.popitem(last=False)
+        self.rendered += 1
+        return section
+
+    def render(self, user_email: str, matches: Iterable, dashboard_url: str) -> tuple[str, str, str]:
+        rendered, reused = self.rendered, self.reused
+        sections = [self._section(key, entries) for key, entries in group_matches(matches)]
+        METRICS.inc("email_digest_fragments_total", self.rendered - rendered, outcome="rendered")
+        METRICS.inc("email_digest_fragments_total", self.reused - reused, outcome="reused")
+        context = {"user_email": user_email, "dashboard_url": dashboard_url}
+        html_body = self._html.render(sections=[html for html, _ in sections], **context)
+        text_body = self._text.render(sections=[text for _, text in sections], **context)
+        return MATCH_EMAIL_SUBJECT, html_body, text_body
+
 
-    return subject, html_body, "\n".join(lines)
+def build_match_email_content(
+    user_email: str, matches: list, dashboard_url: str, renderer: DigestRenderer | None = None
+) -> tuple[str, str, str]:
+    """Build subject and body for alert emails.
+
+    ``matches`` may be ``MenuMatch`` rows or fresh matches; only the match
+    attributes they share are read. They are grouped into one section per
+    date, hall and meal, with every value escaped in the HTML body. Pass one
+    ``renderer`` for a whole run to reuse sections shared between users.
+    """
+    return (renderer or DigestRenderer()).render(user_email, matches, dashboard_url)
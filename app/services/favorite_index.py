@@ -0,0 +1,110 @@
+"""Multi-user favorite matching engine."""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    from app.models import Favorite
+
+LOOKUP_KEY_LENGTH = 3
+_COMMON_CHARS = frozenset("etaoinshrl ")
+
+
+def favorite_lookup_key(normalized_name: str) -> str:
+    """Return the substring of a favorite that ``Favorite.lookup_key`` indexes it by.
+
+    A favorite can only match a menu name that contains it, so any fixed
+    piece of it works as a reverse-lookup key; the trigram with the most
+    uncommon letters is picked to keep each key's postings short. Names of
+    three characters or fewer are their own key.
+    """
+    if len(normalized_name) <= LOOKUP_KEY_LENGTH:
+        return normalized_name
+    grams = (normalized_name[index : index + LOOKUP_KEY_LENGTH] for index in range(len(normalized_name) - 2))
+    return max(grams, key=lambda gram: sum(char not in _COMMON_CHARS for char in gram))
+
+
+def menu_lookup_keys(normalized_names: Iterable[str]) -> set[str]:
+    """Return every lookup key a favorite found in one of these menu names can have."""
+    keys: set[str] = set()
+    for name in set(normalized_names):
+        for length in range(1, LOOKUP_KEY_LENGTH + 1):
+            keys.update(name[index : index + length] for index in range(len(name) - length + 1))
+    return keys
+
+
+class FavoriteMatcher:
+    """Aho–Corasick automaton over many users' normalized favorite names.
+
+    A favorite hits a menu item when its normalized name is a substring of the
+    item's normalized name, the same rule ``find_matches_for_user`` has always
+    used. Each menu name is scanned once regardless of how many favorites are
+    indexed. As with the per-user lookup, a user with several favorites sharing
+    one normalized name gets a single hit reported under the last one added.
+    """
+
+    def __init__(self, favorites: Iterable[Favorite]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[list[int]] = [[]]
+        self._owners: list[dict[int, str]] = []
+        pattern_ids: dict[str, int] = {}
+
+        for favorite in favorites:
+            pattern = favorite.normalized_name
+            if not pattern:
+                continue
+            pattern_id = pattern_ids.get(pattern)
+            if pattern_id is None:
+                pattern_id = pattern_ids[pattern] = len(self._owners)
+                self._owners.append({})
+                self._output[self._insert(pattern)].append(pattern_id)
+            self._owners[pattern_id][favorite.user_id] = favorite.item_name
+
+        self.pattern_count = len(self._owners)
+        self._link()
+
+    def _insert(self, pattern: str) -> int:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        return state
+
+    def _link(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def match(self, normalized_menu_name: str) -> list[tuple[int, str]]:
+        """Return ``(user_id, favorite_item_name)`` for every favorite found in the name."""
+        goto, fail, output = self._goto, self._fail, self._output
+        found: dict[int, None] = {}
+        state = 0
+        for char in normalized_menu_name:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                found[pattern_id] = None
+
+        return [
+            (user_id, favorite_name)
+            for pattern_id in found
+            for user_id, favorite_name in self._owners[pattern_id].items()
+        ]
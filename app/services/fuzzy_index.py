@@ -0,0 +1,138 @@
+"""Typo- and abbreviation-tolerant matching of favorites against menu names."""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+import math
+from typing import Iterable
+
+from app.models import Favorite
+
+STOPWORDS = frozenset({"a", "and", "n", "of", "on", "the", "w", "with"})
+
+
+@dataclass(frozen=True)
+class FuzzySettings:
+    """Thresholds for fuzzy matching.
+
+    ``min_score`` is the average per-token similarity a favorite needs,
+    ``min_token_similarity`` the least a single favorite token may score and
+    still count, and ``candidate_overlap`` the share of a favorite token's
+    trigrams a menu token must contain to be compared at all.
+    """
+
+    min_score: float = 0.8
+    min_token_similarity: float = 0.6
+    candidate_overlap: float = 0.4
+
+
+def tokens(normalized_name: str) -> list[str]:
+    words = normalized_name.split()
+    kept = [word for word in words if word not in STOPWORDS]
+    return kept or words
+
+
+@lru_cache(maxsize=16384)
+def trigrams(token: str) -> frozenset[str]:
+    padded = f"  {token} "
+    return frozenset(padded[index : index + 3] for index in range(len(padded) - 2))
+
+
+@lru_cache(maxsize=65536)
+def token_similarity(favorite_token: str, menu_token: str) -> float:
+    """1.0 for equal tokens, 0.9 when one abbreviates the other, else trigram Dice.
+
+    Dish vocabularies are small, so token pairs and their trigrams are cached.
+    """
+    if favorite_token == menu_token:
+        return 1.0
+    shorter, longer = sorted((favorite_token, menu_token), key=len)
+    if len(shorter) >= 3 and longer.startswith(shorter):
+        return 0.9
+    left, right = trigrams(favorite_token), trigrams(menu_token)
+    return 2 * len(left & right) / (len(left) + len(right))
+
+
+class MenuNameIndex:
+    """Token and trigram index over distinct normalized menu names.
+
+    Built once per menu snapshot. A favorite scores against a menu name as the
+    average, over the favorite's tokens, of each token's best
+    ``token_similarity`` to a token of the name (tokens under
+    ``min_token_similarity`` count as zero). Similar tokens are found through
+    trigram postings over the menu vocabulary, and names through postings of
+    those tokens, so a lookup touches only names sharing a similar token.
+    """
+
+    def __init__(self, normalized_names: Iterable[str], settings: FuzzySettings):
+        self.settings = settings
+        self._names: list[str] = []
+        self._token_postings: dict[str, list[int]] = {}
+        for name in dict.fromkeys(normalized_names):
+            if not name:
+                continue
+            name_id = len(self._names)
+            self._names.append(name)
+            for token in dict.fromkeys(tokens(name)):
+                self._token_postings.setdefault(token, []).append(name_id)
+
+        self._gram_postings: dict[str, list[str]] = {}
+        for token in self._token_postings:
+            for gram in trigrams(token):
+                self._gram_postings.setdefault(gram, []).append(token)
+        self._similar: dict[str, list[tuple[str, float]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def similar_tokens(self, token: str) -> list[tuple[str, float]]:
+        """Return menu vocabulary tokens similar enough to ``token``, with their similarity."""
+        similar = self._similar.get(token)
+        if similar is not None:
+            return similar
+        grams = trigrams(token)
+        shared = Counter(vocab for gram in grams for vocab in self._gram_postings.get(gram, ()))
+        needed = max(1, math.ceil(self.settings.candidate_overlap * len(grams)))
+        similar = self._similar[token] = [
+            (vocab, similarity)
+            for vocab, count in shared.items()
+            if count >= needed
+            and (similarity := token_similarity(token, vocab)) >= self.settings.min_token_similarity
+        ]
+        return similar
+
+    def lookup(self, normalized_favorite: str) -> list[str]:
+        """Return the menu names the favorite fuzzily matches."""
+        favorite_tokens = tokens(normalized_favorite)
+        if not favorite_tokens:
+            return []
+        scores: dict[int, float] = {}
+        for token in favorite_tokens:
+            best: dict[int, float] = {}
+            for vocab, similarity in self.similar_tokens(token):
+                for name_id in self._token_postings[vocab]:
+                    if similarity > best.get(name_id, 0.0):
+                        best[name_id] = similarity
+            for name_id, similarity in best.items():
+                scores[name_id] = scores.get(name_id, 0.0) + similarity
+        needed = self.settings.min_score * len(favorite_tokens)
+        return [self._names[name_id] for name_id, score in scores.items() if score >= needed]
+
+    def match_favorites(self, favorites: Iterable[Favorite]) -> dict[str, list[tuple[int, str]]]:
+        """Map each matched menu name to ``(user_id, favorite_item_name)`` hits.
+
+        Favorites sharing a normalized name are looked up once; as with
+        ``FavoriteMatcher`` a user's duplicates report under the last one.
+        """
+        owners: dict[str, dict[int, str]] = {}
+        for favorite in favorites:
+            if favorite.normalized_name:
+                owners.setdefault(favorite.normalized_name, {})[favorite.user_id] = favorite.item_name
+
+        hits: dict[str, list[tuple[int, str]]] = {}
+        for pattern, users in owners.items():
+            for name in self.lookup(pattern):
+                hits.setdefault(name, []).extend(users.items())
+        return hits
@@ -0,0 +1,141 @@
+"""Database-backed cache of Nutrislice responses."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+import json
+from typing import Iterable
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models import MenuCacheEntry, db
+
+UPSERT_COLUMNS = (
+    "payload",
+    "etag",
+    "last_modified",
+    "location_id",
+    "menu_type_id",
+    "week_start",
+    "fetched_at",
+)
+
+
+@dataclass
+class CachedPayload:
+    """A cached response body plus the validators needed to revalidate it."""
+
+    payload: dict | list
+    etag: str | None
+    last_modified: str | None
+    fresh: bool
+    fetched_at: datetime | None = None
+
+
+class MenuCache:
+    """Stores Nutrislice payloads in ``MenuCacheEntry`` rows with a TTL.
+
+    Entries younger than ``ttl_seconds`` are served without touching the
+    network; older ones keep their ETag/Last-Modified so the client can
+    revalidate them with a conditional request, or serve them as a last known
+    good copy while Nutrislice is failing. The cache uses its own short
+    sessions so its commits never expire objects held by the caller.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl = timedelta(seconds=ttl_seconds)
+
+    def lookup(self, resources: Iterable[str]) -> dict[str, CachedPayload]:
+        resources = list(resources)
+        if not resources:
+            return {}
+        cutoff = datetime.utcnow() - self.ttl
+        with Session(db.engine) as session:
+            entries = session.query(MenuCacheEntry).filter(MenuCacheEntry.resource.in_(resources)).all()
+            return {
+                entry.resource: CachedPayload(
+                    payload=json.loads(entry.payload),
+                    etag=entry.etag,
+                    last_modified=entry.last_modified,
+                    fresh=entry.fetched_at > cutoff,
+                    fetched_at=entry.fetched_at,
+                )
+                for entry in entries
+            }
+
+    def save(self, updates: list[dict], revalidated: Iterable[str] = ()) -> None:
+        """Upsert fresh payloads and bump ``fetched_at`` on revalidated resources.
+
+        Each update holds ``resource`` and ``payload`` plus optional ``etag``,
+        ``last_modified``, ``location_id``, ``menu_type_id`` and ``week_start``.
+        Writers saving the same new resource concurrently (scan workers,
+        manual checks, ``warm_menus``) resolve on the unique ``resource``
+        instead of failing; the last write wins.
+        """
+        revalidated = list(revalidated)
+        if not updates and not revalidated:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                "resource": update["resource"],
+                "payload": json.dumps(update["payload"]),
+                "etag": update.get("etag"),
+                "last_modified": update.get("last_modified"),
+                "location_id": update.get("location_id"),
+                "menu_type_id": update.get("menu_type_id"),
+                "week_start": update.get("week_start"),
+                "fetched_at": now,
+            }
+            for update in updates
+        ]
+        with Session(db.engine) as session:
+            if rows:
+                statement = _upsert_statement(session.get_bind().dialect.name)
+                if statement is None:
+                    _save_without_upsert(session, rows)
+                else:
+                    session.execute(statement, rows)
+            if revalidated:
+                session.execute(
+                    update(MenuCacheEntry)
+                    .where(MenuCacheEntry.resource.in_(revalidated))
+                    .values(fetched_at=now)
+                )
+            session.commit()
+
+
+def _upsert_statement(dialect: str):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    statement = insert(MenuCacheEntry)
+    return statement.on_conflict_do_update(
+        index_elements=["resource"],
+        set_={column: statement.excluded[column] for column in UPSERT_COLUMNS},
+    )
+
+
+def _save_without_upsert(session: Session, rows: list[dict]) -> None:
+    """Insert-or-update for dialects without ``ON CONFLICT``, retrying a lost insert race as an update."""
+    for row in rows:
+        entry = session.query(MenuCacheEntry).filter_by(resource=row["resource"]).one_or_none()
+        if entry is not None:
+            for column in UPSERT_COLUMNS:
+                setattr(entry, column, row[column])
+            continue
+        try:
+            with session.begin_nested():
+                session.add(MenuCacheEntry(**row))
+        except IntegrityError:
+            session.execute(
+                update(MenuCacheEntry)
+                .where(MenuCacheEntry.resource == row["resource"])
+                .values({column: row[column] for column in UPSERT_COLUMNS})
+            )
@@ -2,83 +2,405 @@
 
 from __future__ import annotations
 
-from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import date, datetime
 import logging
+import multiprocessing
 import os
-from flask import current_app
+import time
+from typing import Iterable, Iterator
 
-from flask import current_app, url_for
+from flask import current_app, has_request_context, url_for
+from sqlalchemy import and_, false, func, or_, select, union
+from sqlalchemy.orm import selectinload
 
-from app.models import Favorite, MenuMatch, User, db
-from app.services.email_service import build_match_email_content
-from app.services.nutrislice_client import NutrisliceClient, normalize_item_name
+from app.models import Favorite, MenuMatch, MenuVersion, ScanWatermark, User, UserDiningHall, UserMeal, db
+from app.services.digest_schedule import DigestSchedule
+from app.services.email_service import BatchSendResult, DigestRenderer, OutgoingEmail, build_match_email_content
+from app.services.favorite_index import FavoriteMatcher, menu_lookup_keys
+from app.services.fuzzy_index import FuzzySettings, MenuNameIndex
+from app.services.menu_cache import MenuCache
+from app.services.menu_snapshot import MenuSnapshot
+from app.services.metrics import METRICS
+from app.services.nutrislice_client import MenuItem, NutrisliceClient
 
 LOGGER = logging.getLogger(__name__)
 
 
-def find_matches_for_user(user: User, menus: list[dict], favorites: list[Favorite]) -> list[dict]:
-    """Return structured matches for one user against fetched menus."""
-    favorite_lookup = {fav.normalized_name: fav.item_name for fav in favorites}
-    matches: list[dict] = []
-
-    for menu in menus:
-        normalized_menu = normalize_item_name(menu["name"])
-        for normalized_fav, favorite_name in favorite_lookup.items():
-            if normalized_fav and normalized_fav in normalized_menu:
-                matches.append(
-                    {
-                        "favorite_item_name": favorite_name,
-                        "menu_item_name": menu["name"],
-                        "dining_hall": menu["dining_hall"],
-                        "meal": menu.get("meal"),
-                        "menu_date": menu["date"],
-                    }
-                )
-    return matches
+class FavoriteMatch:
+    """A favorite found in a menu item.
+
+    Menu fields are read through the shared ``MenuItem`` rather than copied,
+    and are named like the ``MenuMatch`` columns so stored rows and fresh
+    matches can be passed to the same code.
+    """
 
+    __slots__ = ("favorite_item_name", "item")
 
-def _fetch_menus_for_user(user: User, lookahead_days: int) -> list[dict]:
-    client = NutrisliceClient()
-    locations = client.get_locations()
-    selected_halls = set(user.dining_halls_list())
-    selected_meals = {meal.lower() for meal in user.meals_list()}
-    menus: list[dict] = []
-
-    for offset in range(lookahead_days):
-        target_date = date.today() + timedelta(days=offset)
-        for location in locations:
-            if selected_halls and location["name"] not in selected_halls:
-                continue
-            items = client.get_menu_for_date_and_location(target_date, location["id"])
-            for item in items:
+    def __init__(self, favorite_item_name: str, item: MenuItem):
+        self.favorite_item_name = favorite_item_name
+        self.item = item
+
+    @property
+    def menu_item_name(self) -> str:
+        return self.item.name
+
+    @property
+    def dining_hall(self) -> str:
+        return self.item.dining_hall
+
+    @property
+    def meal(self) -> str:
+        return self.item.meal
+
+    @property
+    def menu_date(self) -> date:
+        return self.item.date
+
+    def __repr__(self) -> str:
+        return f"FavoriteMatch({self.favorite_item_name!r}, {self.item!r})"
+
+
+def _hit_finder(favorites: list[Favorite], name_index: MenuNameIndex | None):
+    """Return a memoized ``normalized menu name -> [(user_id, favorite name)]`` lookup.
+
+    Exact substring hits come first; with a ``name_index`` fuzzy hits not
+    already found exactly are appended.
+    """
+    matcher = FavoriteMatcher(favorites)
+    fuzzy_hits = name_index.match_favorites(favorites) if name_index is not None else {}
+    hits_by_name: dict[str, list[tuple[int, str]]] = {}
+
+    def hits_for(normalized_name: str) -> list[tuple[int, str]]:
+        hits = hits_by_name.get(normalized_name)
+        if hits is None:
+            hits = matcher.match(normalized_name)
+            if normalized_name in fuzzy_hits:
+                hits = list(dict.fromkeys(hits + fuzzy_hits[normalized_name]))
+            hits_by_name[normalized_name] = hits
+        return hits
+
+    return hits_for
+
+
+def find_matches_for_user(
+    user: User, menus: list[MenuItem], favorites: list[Favorite], fuzzy: FuzzySettings | None = None
+) -> list[FavoriteMatch]:
+    """Return matches for one user against fetched menu items.
+
+    With ``fuzzy`` settings, near matches such as abbreviations and typos
+    count too.
+    """
+    name_index = MenuNameIndex((item.normalized_name for item in menus), fuzzy) if fuzzy else None
+    hits_for = _hit_finder(favorites, name_index)
+    return [
+        FavoriteMatch(favorite_name, item)
+        for item in menus
+        for _, favorite_name in hits_for(item.normalized_name)
+    ]
+
+
+def match_snapshot(
+    snapshot: MenuSnapshot,
+    users: list[User],
+    menu_keys: set[tuple[int, date]] | None = None,
+    favorites: list[Favorite] | None = None,
+    fuzzy: FuzzySettings | None = None,
+) -> dict[int, list[FavoriteMatch]]:
+    """Match every user against the snapshot, scanning each distinct item name once.
+
+    ``menu_keys`` limits the scan to some (location_id, date) menus and
+    ``favorites`` to a subset of the users' favorites. ``fuzzy`` adds near
+    matches found through the snapshot's precomputed name index.
+    """
+    if favorites is None:
+        favorites = [favorite for user in users for favorite in user.favorites]
+    hits_for = _hit_finder(favorites, snapshot.name_index(fuzzy) if fuzzy else None)
+    preferences = {
+        user.id: (set(user.dining_halls_list()), {meal.lower() for meal in user.meals_list()})
+        for user in users
+    }
+    matches: dict[int, list[FavoriteMatch]] = {user.id: [] for user in users}
+
+    for location, _, items in snapshot.iter_menus(menu_keys):
+        for item in items:
+            for user_id, favorite_name in hits_for(item.normalized_name):
+                selected_halls, selected_meals = preferences[user_id]
+                if selected_halls and location["name"] not in selected_halls:
+                    continue
                 if selected_meals and item.meal.lower() not in selected_meals:
                     continue
-                menus.append(
-                    {
-                        "name": item.name,
-                        "dining_hall": item.dining_hall,
-                        "meal": item.meal,
-                        "date": item.date,
-                    }
+                matches[user_id].append(FavoriteMatch(favorite_name, item))
+
+    for selected_halls, _ in preferences.values():
+        snapshot.record_reads(selected_halls, menu_keys)
+    return matches
+
+
+def _needs_full_rescan(user: User) -> bool:
+    if user.last_checked_at is None:
+        return True
+    return bool(user.preferences_updated_at and user.preferences_updated_at > user.last_checked_at)
+
+
+def _match_incrementally(
+    snapshot: MenuSnapshot,
+    users: list[User],
+    changed: set[tuple[int, date]],
+    fuzzy: FuzzySettings | None = None,
+) -> dict[int, list[FavoriteMatch]]:
+    """Re-match changed menus for everyone and unchanged menus only for new favorites.
+
+    Users never checked before, or whose preferences changed since, get a
+    full match.
+    """
+    full = [user for user in users if _needs_full_rescan(user)]
+    rest = [user for user in users if not _needs_full_rescan(user)]
+    matches = match_snapshot(snapshot, full, fuzzy=fuzzy)
+    if not rest:
+        return matches
+
+    matches.update(match_snapshot(snapshot, rest, menu_keys=changed, fuzzy=fuzzy))
+    new_favorites = [
+        favorite
+        for user in rest
+        for favorite in user.favorites
+        if favorite.created_at and favorite.created_at > user.last_checked_at
+    ]
+    if new_favorites:
+        unchanged = set(snapshot.menus) - changed
+        for user_id, found in match_snapshot(snapshot, rest, unchanged, new_favorites, fuzzy).items():
+            matches[user_id].extend(found)
+    return matches
+
+
+def _shard_key(shard: tuple[int, int] | None) -> str:
+    return "" if shard is None else f"{shard[0]}/{shard[1]}"
+
+
+def _changed_menus(
+    snapshot: MenuSnapshot, shard: tuple[int, int] | None = None
+) -> tuple[set[tuple[int, date]], dict[tuple[int, date], str]]:
+    """Compare snapshot menus with the ``MenuVersion`` hashes stored for ``shard``.
+
+    Returns the changed (location_id, date) keys and all current hashes.
+    """
+    hashes = snapshot.content_hashes()
+    stored = {
+        (row.location_id, row.menu_date): row.content_hash
+        for row in MenuVersion.query.filter(
+            MenuVersion.shard == _shard_key(shard), MenuVersion.menu_date.in_(snapshot.dates)
+        )
+    }
+    changed = {key for key, content_hash in hashes.items() if stored.get(key) != content_hash}
+    return changed, hashes
+
+
+def _save_menu_versions(
+    snapshot: MenuSnapshot, hashes: dict[tuple[int, date], str], shard: tuple[int, int] | None = None
+) -> None:
+    now = datetime.utcnow()
+    shard_key = _shard_key(shard)
+    stored = {
+        (row.location_id, row.menu_date): row
+        for row in MenuVersion.query.filter(
+            MenuVersion.shard == shard_key, MenuVersion.menu_date.in_(snapshot.dates)
+        )
+    }
+    for (location_id, menu_date), content_hash in hashes.items():
+        row = stored.get((location_id, menu_date))
+        if row is None:
+            db.session.add(
+                MenuVersion(
+                    shard=shard_key,
+                    location_id=location_id,
+                    menu_date=menu_date,
+                    content_hash=content_hash,
+                    changed_at=now,
                 )
-    return menus
+            )
+        elif row.content_hash != content_hash:
+            row.content_hash = content_hash
+            row.changed_at = now
+    MenuVersion.query.filter(MenuVersion.menu_date < min(snapshot.dates)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _scan_watermark(shard: tuple[int, int] | None) -> datetime | None:
+    watermark = db.session.get(ScanWatermark, _shard_key(shard))
+    return watermark.started_at if watermark is not None else None
+
+
+def _digest_schedule() -> DigestSchedule:
+    return DigestSchedule(
+        morning_hour=current_app.config["DIGEST_MORNING_HOUR_UTC"],
+        weekly_weekday=current_app.config["DIGEST_WEEKLY_WEEKDAY"],
+    )
+
+
+def _fuzzy_settings() -> FuzzySettings | None:
+    config = current_app.config
+    if not config.get("FUZZY_MATCHING"):
+        return None
+    return FuzzySettings(
+        min_score=config["FUZZY_MIN_SCORE"],
+        min_token_similarity=config["FUZZY_MIN_TOKEN_SIMILARITY"],
+        candidate_overlap=config["FUZZY_CANDIDATE_OVERLAP"],
+    )
+
+
+def _build_client() -> NutrisliceClient:
+    return NutrisliceClient(
+        base_url=current_app.config["NUTRISLICE_BASE_URL"],
+        max_workers=current_app.config["NUTRISLICE_MAX_WORKERS"],
+        cache=MenuCache(current_app.config["MENU_CACHE_TTL_SECONDS"]),
+        timeout=current_app.config["NUTRISLICE_TIMEOUT_SECONDS"],
+        retries=current_app.config["NUTRISLICE_RETRIES"],
+        backoff_seconds=current_app.config["NUTRISLICE_BACKOFF_SECONDS"],
+        breaker=current_app.extensions.get("nutrislice_breaker"),
+    )
+
+
+def _fetch_menus_for_user(
+    user: User, lookahead_days: int, snapshot: MenuSnapshot | None = None
+) -> list[MenuItem]:
+    if snapshot is None:
+        halls = user.dining_halls_list() or None
+        meals = user.meals_list() or None
+        with _build_client() as client:
+            snapshot = MenuSnapshot.build(client, lookahead_days, halls=halls, meals=meals)
+    selected_halls = set(user.dining_halls_list())
+    selected_meals = {meal.lower() for meal in user.meals_list()}
+    return snapshot.items_for(selected_halls, selected_meals)
+
+
+def _dashboard_url() -> str:
+    if has_request_context():
+        return url_for("dashboard", _external=True)
+    return current_app.config.get("DASHBOARD_URL", "")
+
+
+def _build_alert(
+    user: User, matches: list[MenuMatch], dashboard_url: str, renderer: DigestRenderer | None = None
+) -> OutgoingEmail:
+    subject, html_body, text_body = build_match_email_content(user.email, matches, dashboard_url, renderer)
+    return OutgoingEmail(user.email, subject, html_body, text_body)
+
+
+def _send_alerts_for_matches(user: User, matches: list[MenuMatch]) -> bool:
+    email_client = current_app.extensions.get("email_client")
+    if email_client is None:
+        LOGGER.info("SMTP not configured; skipping alert email for user_id=%s", user.id)
+        return False
+    alert = _build_alert(user, matches, _dashboard_url())
+    email_client.send_html_email(alert.to_email, alert.subject, alert.html_body, alert.text_body)
+    return True
+
+
+def _insert_statement():
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(MenuMatch).on_conflict_do_nothing(index_elements=list(MenuMatch.IDENTITY_COLUMNS))
+
+
+def store_matches(matches_by_user: dict[int, list[FavoriteMatch]]) -> int:
+    """Bulk-insert matches in one statement, skipping any already stored.
+
+    Returns the number of matches that were new.
+    """
+    now = datetime.utcnow()
+    columns = MenuMatch.IDENTITY_COLUMNS[1:]
+    rows = {}
+    for user_id, matches in matches_by_user.items():
+        for match in matches:
+            values = tuple(getattr(match, column) for column in columns)
+            rows[(user_id, *values)] = {"user_id": user_id, **dict(zip(columns, values)), "created_at": now}
+    if not rows:
+        return 0
+
+    statement = _insert_statement()
+    if statement is None:
+        identity = tuple(getattr(MenuMatch, column) for column in MenuMatch.IDENTITY_COLUMNS)
+        existing = db.session.query(*identity).filter(MenuMatch.user_id.in_(list(matches_by_user)))
+        for key in map(tuple, existing):
+            rows.pop(key, None)
+        if rows:
+            db.session.execute(MenuMatch.__table__.insert(), list(rows.values()))
+        return len(rows)
+    return len(db.session.execute(statement.returning(MenuMatch.id), list(rows.values())).all())
+
+
+def pending_matches(user_ids: list[int], since: date | None = None) -> dict[int, list[MenuMatch]]:
+    """Return stored matches not yet included in an alert, grouped by user.
+
+    ``since`` skips matches for menus before that date.
+    """
+    pending: dict[int, list[MenuMatch]] = {}
+    rows = MenuMatch.query.filter(MenuMatch.user_id.in_(user_ids), MenuMatch.notified_at.is_(None))
+    if since is not None:
+        rows = rows.filter(MenuMatch.menu_date >= since)
+    rows = rows.order_by(MenuMatch.menu_date, MenuMatch.id)
+    for row in rows:
+        pending.setdefault(row.user_id, []).append(row)
+    return pending
+
+
+def mark_notified(match_ids: list[int]) -> None:
+    if match_ids:
+        MenuMatch.query.filter(MenuMatch.id.in_(match_ids)).update(
+            {MenuMatch.notified_at: datetime.utcnow()}, synchronize_session=False
+        )
+
+
+@contextmanager
+def _stage(name: str, totals: dict[str, float] | None = None) -> Iterator[None]:
+    """Time one pipeline stage into the metrics registry and, optionally, a run's totals."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        METRICS.observe("menu_check_stage_seconds", elapsed, stage=name)
+        if totals is not None:
+            totals[name] = totals.get(name, 0.0) + elapsed
+
+
+def _nutrislice_disabled() -> bool:
+    return os.getenv("DISABLE_NUTRISLICE", "false").lower() == "true"
 
 
-def run_menu_check_for_user(user_id: int, send_email: bool = True):
+def run_menu_check_for_user(
+    user_id: int,
+    send_email: bool = True,
+    snapshot: MenuSnapshot | None = None,
+    raise_errors: bool = False,
+) -> list[FavoriteMatch]:
     """
     Run a menu check for a single user.
 
+    Matches are stored in ``MenuMatch``; only those not already emailed are
+    included in the alert. A manual check emails right away whatever the
+    user's ``notification_frequency``, and starts a new digest window.
+
     In demo / production mode we don't want this to ever crash the request,
     even if Nutrislice or SMTP is broken. All errors are caught and we either
-    return an empty list or log what went wrong.
-    """
-    from app.models import User  
+    return an empty list or log what went wrong, unless ``raise_errors`` is
+    set; the manual check queue uses it to report failed jobs.
 
-    user = User.query.get(user_id)
+    ``snapshot`` lets batch scans share one set of fetched menus; when omitted
+    the menus for this user's halls are fetched on demand.
+    """
+    user = db.session.get(User, user_id, options=[selectinload(User.favorites)])
     if not user:
         return []
 
-    if os.getenv("DISABLE_NUTRISLICE", "false").lower() == "true":
+    if _nutrislice_disabled():
         current_app.logger.info(
             "DISABLE_NUTRISLICE=true – skipping Nutrislice calls and returning no matches."
         )
@@ -86,27 +408,539 @@ def run_menu_check_for_user(user_id: int, send_email: bool = True):
 
     try:
         lookahead_days = current_app.config.get("MENU_LOOKAHEAD_DAYS", 3)
-        menus = _fetch_menus_for_user(user, lookahead_days)
-        matches = _find_matches_for_user(user, menus)
+        with _stage("fetch"):
+            menus = _fetch_menus_for_user(user, lookahead_days, snapshot=snapshot)
+        with _stage("match"):
+            matches = find_matches_for_user(user, menus, user.favorites, _fuzzy_settings())
+        with _stage("store"):
+            store_matches({user.id: matches})
+            new_matches = pending_matches([user.id], since=date.today()).get(user.id, [])
 
-        if send_email and matches:
-            _send_alerts_for_matches(user, matches)
+        if send_email and new_matches:
+            with _stage("email"):
+                if _send_alerts_for_matches(user, new_matches):
+                    mark_notified([row.id for row in new_matches])
+                    user.last_notified_at = datetime.utcnow()
+        db.session.commit()
 
+        METRICS.inc("menu_check_runs_total", kind="user")
+        METRICS.inc("menu_check_matches_total", len(matches))
         return matches
     except Exception:
+        if raise_errors:
+            db.session.rollback()
+            raise
         current_app.logger.exception(
             "Error while running menu check for user_id=%s", user_id
         )
         return []
 
 
-def run_menu_check_for_all_users(send_email: bool = True) -> dict[str, int]:
-    """Run checks for all users and return summary."""
-    summary = {"users_checked": 0, "users_with_matches": 0, "total_matches": 0}
-    for user in User.query.all():
-        summary["users_checked"] += 1
-        matches = run_menu_check_for_user(user.id, send_email=send_email)
-        if matches:
-            summary["users_with_matches"] += 1
-            summary["total_matches"] += len(matches)
+def _halls_needed() -> set[str] | None:
+    """Union of halls selected by users with favorites; ``None`` if any of them wants every hall."""
+    wants_every_hall = (
+        db.session.query(User.id)
+        .filter(User.favorites.any(), ~User.dining_hall_preferences.any())
+        .first()
+    )
+    if wants_every_hall:
+        return None
+    rows = (
+        db.session.query(UserDiningHall.dining_hall)
+        .join(User, User.id == UserDiningHall.user_id)
+        .filter(User.favorites.any())
+        .distinct()
+    )
+    return {hall for (hall,) in rows}
+
+
+def _subscribed_to(halls: set[str], meals: set[str]):
+    if not halls:
+        return false()
+    return and_(
+        or_(
+            ~User.dining_hall_preferences.any(),
+            User.dining_hall_preferences.any(UserDiningHall.dining_hall.in_(halls)),
+        ),
+        or_(
+            ~User.meal_preferences.any(),
+            User.meal_preferences.any(func.lower(UserMeal.meal).in_(meals)),
+        ),
+    )
+
+
+def _join_subscriptions(query, halls: set[str], meals: set[str]):
+    """Keep ``Favorite.user_id`` rows whose user selected one of ``halls`` and ``meals`` (or none at all)."""
+    return (
+        query.outerjoin(UserDiningHall, UserDiningHall.user_id == Favorite.user_id)
+        .outerjoin(UserMeal, UserMeal.user_id == Favorite.user_id)
+        .where(
+            or_(UserDiningHall.user_id.is_(None), UserDiningHall.dining_hall.in_(halls)),
+            or_(UserMeal.user_id.is_(None), func.lower(UserMeal.meal).in_(meals)),
+        )
+    )
+
+
+def _candidate_user_ids(
+    snapshot: MenuSnapshot,
+    changed: set[tuple[int, date]],
+    shard: tuple[int, int] | None = None,
+    fuzzy: FuzzySettings | None = None,
+    since: datetime | None = None,
+):
+    """Select, in id order, the users with favorites an incremental scan must re-match.
+
+    The ids are a UNION of index lookups rather than a filter over every
+    user:
+
+    * favorites whose ``lookup_key`` occurs in a changed menu, kept when
+      their user subscribes to its hall and meal; fuzzy matches need not
+      contain the favorite, so with ``fuzzy`` every subscribed favorite
+      counts;
+    * favorites added since their user's last check;
+    * users whose preferences changed since their last check.
+
+    ``since``, when the shard's previous incremental scan started, bounds the
+    last two to rows changed after it; that scan re-matched everything
+    older.
+    """
+    branches = []
+    halls, meals = snapshot.served_halls_and_meals(changed)
+    keys = () if fuzzy else menu_lookup_keys(
+        item.normalized_name for _, _, items in snapshot.iter_menus(changed) for item in items
+    )
+    if halls and (fuzzy or keys):
+        interested = select(Favorite.user_id)
+        if not fuzzy:
+            interested = interested.where(Favorite.lookup_key.in_(sorted(keys)))
+        branches.append(_join_subscriptions(interested, halls, meals))
+
+    added = (
+        select(Favorite.user_id)
+        .join(User, User.id == Favorite.user_id)
+        .where(or_(User.last_checked_at.is_(None), Favorite.created_at > User.last_checked_at))
+    )
+    updated = (
+        select(Favorite.user_id)
+        .join(User, User.id == Favorite.user_id)
+        .where(User.preferences_updated_at > User.last_checked_at)
+    )
+    if since is not None:
+        added = added.where(Favorite.created_at > since)
+        updated = updated.where(User.preferences_updated_at > since)
+    branches += [added, updated]
+
+    candidates = union(*branches).subquery()
+    query = select(candidates.c.user_id)
+    if shard is not None:
+        query = query.where(candidates.c.user_id % shard[1] == shard[0])
+    return query.order_by(candidates.c.user_id)
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse ``"i/n"`` (0 <= i < n) into a shard tuple."""
+    index, _, count = value.partition("/")
+    shard = (int(index), int(count))
+    if not 0 <= shard[0] < shard[1]:
+        raise ValueError(f"shard must be i/n with 0 <= i < n, got {value!r}")
+    return shard
+
+
+def _split_shard(shard: tuple[int, int] | None, workers: int) -> list[tuple[int, int]]:
+    """Subdivide a host's ``shard`` (everything when ``None``) into one shard per worker."""
+    index, count = shard or (0, 1)
+    return [(index + count * worker, count * workers) for worker in range(workers)]
+
+
+def _iter_user_chunks(
+    snapshot: MenuSnapshot,
+    chunk_size: int,
+    changed: set[tuple[int, date]] | None = None,
+    shard: tuple[int, int] | None = None,
+    fuzzy: FuzzySettings | None = None,
+    since: datetime | None = None,
+) -> Iterator[list[User]]:
+    """Yield users subscribed to menus in the snapshot, ``chunk_size`` at a time.
+
+    Only users with favorites whose hall and meal selections are served are
+    loaded. With ``changed`` (an incremental scan) the ids of users who may
+    be affected are collected once by ``_candidate_user_ids`` and paged
+    over, so the cost follows the number of affected users rather than the
+    total. ``shard`` ``(i, n)`` keeps the users whose id is ``i`` modulo
+    ``n``. Each chunk is loaded with favorites and preferences eager-loaded,
+    so it costs a fixed number of queries, and is expunged before the next
+    one is read.
+    """
+    options = (
+        selectinload(User.favorites),
+        selectinload(User.dining_hall_preferences),
+        selectinload(User.meal_preferences),
+    )
+    if changed is not None:
+        user_ids = db.session.scalars(_candidate_user_ids(snapshot, changed, shard, fuzzy, since)).all()
+        for start in range(0, len(user_ids), chunk_size):
+            chunk_ids = user_ids[start : start + chunk_size]
+            yield User.query.options(*options).filter(User.id.in_(chunk_ids)).order_by(User.id).all()
+            db.session.expunge_all()
+        return
+
+    query = User.query.options(*options).filter(
+        User.favorites.any(), _subscribed_to(*snapshot.served_halls_and_meals())
+    )
+    if shard is not None:
+        query = query.filter(User.id % shard[1] == shard[0])
+    last_id = 0
+    while True:
+        chunk = query.filter(User.id > last_id).order_by(User.id).limit(chunk_size).all()
+        if not chunk:
+            return
+        last_id = chunk[-1].id
+        yield chunk
+        db.session.expunge_all()
+
+
+def _scan_users(
+    snapshot: MenuSnapshot,
+    changed: set[tuple[int, date]],
+    incremental: bool,
+    send_email: bool,
+    started_at: datetime,
+    shard: tuple[int, int] | None = None,
+    since: datetime | None = None,
+) -> dict:
+    """Match and store the users in ``shard``, then send their due digests.
+
+    ``since`` is the shard's incremental watermark (see ``_candidate_user_ids``).
+    Returns the shard's partial summary.
+    """
+    stage_seconds: dict[str, float] = {}
+    summary = {"users_checked": 0, "users_with_matches": 0, "total_matches": 0, "new_matches": 0}
+    hits_before = snapshot.hits
+    fuzzy = _fuzzy_settings()
+    chunks = _iter_user_chunks(
+        snapshot, current_app.config["SCAN_CHUNK_SIZE"], changed if incremental else None, shard, fuzzy, since
+    )
+    while True:
+        with _stage("load_users", stage_seconds):
+            users = next(chunks, None)
+        if users is None:
+            break
+        with _stage("match", stage_seconds):
+            if incremental:
+                matches_by_user = _match_incrementally(snapshot, users, changed, fuzzy)
+            else:
+                matches_by_user = match_snapshot(snapshot, users, fuzzy=fuzzy)
+        with _stage("store", stage_seconds):
+            summary["new_matches"] += store_matches(matches_by_user)
+
+        for user in users:
+            summary["users_checked"] += 1
+            matches = matches_by_user[user.id]
+            if matches:
+                summary["users_with_matches"] += 1
+                summary["total_matches"] += len(matches)
+        with _stage("commit", stage_seconds):
+            User.query.filter(User.id.in_([user.id for user in users])).update(
+                {User.last_checked_at: started_at}, synchronize_session=False
+            )
+            db.session.commit()
+
+    summary["menu_snapshot_hits"] = snapshot.hits - hits_before
+    if send_email:
+        summary.update(send_due_digests(started_at, shard, stage_seconds))
+    else:
+        summary.update(BatchSendResult().as_summary())
+    summary["stage_seconds"] = stage_seconds
+    return summary
+
+
+def _iter_due_users(
+    now: datetime, chunk_size: int, shard: tuple[int, int] | None = None
+) -> Iterator[list[User]]:
+    """Yield users whose digest is due and who have upcoming pending matches, by primary key."""
+    has_pending = (
+        db.session.query(MenuMatch.id)
+        .filter(
+            MenuMatch.user_id == User.id,
+            MenuMatch.notified_at.is_(None),
+            MenuMatch.menu_date >= date.today(),
+        )
+        .exists()
+    )
+    query = User.query.filter(has_pending, _digest_schedule().due_filter(now))
+    if shard is not None:
+        query = query.filter(User.id % shard[1] == shard[0])
+    last_id = 0
+    while True:
+        chunk = query.filter(User.id > last_id).order_by(User.id).limit(chunk_size).all()
+        if not chunk:
+            return
+        last_id = chunk[-1].id
+        yield chunk
+        db.session.expunge_all()
+
+
+def send_due_digests(
+    now: datetime | None = None,
+    shard: tuple[int, int] | None = None,
+    stage_seconds: dict[str, float] | None = None,
+) -> dict:
+    """Email one digest of pending matches to every user whose window is due.
+
+    Matches wait in ``MenuMatch`` with ``notified_at`` unset until their
+    user's ``notification_frequency`` window comes round (see
+    ``DigestSchedule``), so scans can run often while each user still gets at
+    most one email per window. Delivered matches are marked notified and the
+    user's ``last_notified_at`` set; failed recipients stay pending.
+    """
+    now = now or datetime.utcnow()
+    delivery = BatchSendResult()
+    summary = {"digest_users_due": 0}
+    email_client = current_app.extensions.get("email_client")
+    dashboard_url = _dashboard_url()
+    renderer = DigestRenderer()
+    chunks = _iter_due_users(now, current_app.config["SCAN_CHUNK_SIZE"], shard)
+    while True:
+        with _stage("load_pending", stage_seconds):
+            users = next(chunks, None)
+            if users is None:
+                break
+            pending = pending_matches([user.id for user in users], since=date.today())
+        summary["digest_users_due"] += len(users)
+        if email_client is None:
+            LOGGER.info("SMTP not configured; leaving %s digests pending", len(users))
+            continue
+
+        alerts: list[OutgoingEmail] = []
+        alerted: dict[str, tuple[int, list[int]]] = {}
+        with _stage("email_render", stage_seconds):
+            for user in users:
+                matches = pending.get(user.id)
+                if matches:
+                    alerts.append(_build_alert(user, matches, dashboard_url, renderer))
+                    alerted[user.email] = (user.id, [row.id for row in matches])
+        with _stage("email_send", stage_seconds):
+            result = email_client.send_batch(alerts)
+        delivery.add(result)
+        for email in result.failed_recipients:
+            alerted.pop(email, None)
+        with _stage("commit", stage_seconds):
+            mark_notified([match_id for _, ids in alerted.values() for match_id in ids])
+            User.query.filter(User.id.in_([user_id for user_id, _ in alerted.values()])).update(
+                {User.last_notified_at: now}, synchronize_session=False
+            )
+            db.session.commit()
+
+    summary.update(delivery.as_summary())
     return summary
+
+
+def _scan_shard_in_worker(config: dict, snapshot: MenuSnapshot, *args) -> dict:
+    """Process-pool entry point: run ``_scan_users`` in a fresh app with its own DB engine."""
+    from app import create_app
+
+    app = create_app(config)
+    with app.app_context():
+        try:
+            return _scan_users(snapshot, *args)
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+
+
+def _merge_summaries(summary: dict, partials: Iterable[dict]) -> None:
+    stage_seconds = summary.setdefault("stage_seconds", {})
+    for partial in partials:
+        for key, value in partial.items():
+            if key == "stage_seconds":
+                for name, seconds in value.items():
+                    stage_seconds[name] = stage_seconds.get(name, 0.0) + seconds
+            else:
+                summary[key] = summary.get(key, 0) + value
+
+
+def _scan_in_processes(
+    snapshot: MenuSnapshot,
+    changed: set[tuple[int, date]],
+    incremental: bool,
+    send_email: bool,
+    started_at: datetime,
+    shards: list[tuple[int, int]],
+    since: datetime | None = None,
+) -> list[dict]:
+    """Scan each shard in its own process against a pickled copy of the snapshot."""
+    config = dict(current_app.config)
+    if config["SQLALCHEMY_DATABASE_URI"] in ("sqlite://", "sqlite:///:memory:"):
+        raise ValueError("multi-process scans need a database the workers can share, not in-memory SQLite")
+    # Worker processes open their own connections; don't hand them ours.
+    db.session.remove()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as executor:
+        futures = [
+            executor.submit(
+                _scan_shard_in_worker, config, snapshot, changed, incremental, send_email, started_at, shard, since
+            )
+            for shard in shards
+        ]
+        return [future.result() for future in futures]
+
+
+def run_menu_check_for_all_users(
+    send_email: bool = True,
+    incremental: bool = False,
+    workers: int = 1,
+    shard: tuple[int, int] | None = None,
+) -> dict[str, int]:
+    """Run checks for all users and return summary.
+
+    Menus are fetched once into a shared snapshot. Users subscribed to halls
+    and meals served in it are then streamed in chunks; each chunk's favorites
+    are matched in a single pass and stored with duplicates skipped. Matches
+    not emailed before then wait for their user's digest window, and
+    ``send_due_digests`` mails the users who are due, one SMTP batch per
+    chunk.
+
+    With ``incremental`` only menus whose content hash changed since the last
+    scan are matched against everyone, and unchanged menus only against
+    favorites added since each user's ``last_checked_at``. The hashes are
+    kept per ``shard``, so each shard diffs against its own last scan.
+
+    ``shard`` ``(i, n)`` limits the scan to users whose id is ``i`` modulo
+    ``n`` so several hosts can split one scan. With ``workers`` above one the
+    users are split further across a process pool; each worker gets a copy of
+    the snapshot and its own database connection, and their summaries are
+    merged.
+
+    When the menus cannot be fetched the scan is skipped, but digests of
+    matches stored by earlier runs are still sent when due.
+
+    Time spent in each stage is recorded in ``METRICS`` and returned under
+    ``stage_seconds``, summed across workers. Weeks Nutrislice failed to serve
+    are listed under ``stale_menus`` when an older cached copy was used and
+    ``unavailable_menus`` when none existed.
+    """
+    started_at = datetime.utcnow()
+    stage_seconds: dict[str, float] = {}
+    summary = {
+        "users_checked": 0,
+        "users_with_matches": 0,
+        "total_matches": 0,
+        "new_matches": 0,
+        "menu_fetches": 0,
+        "menu_cache_hits": 0,
+        "menu_snapshot_hits": 0,
+        "incremental": incremental,
+        "menus_changed": 0,
+        "menus_unchanged": 0,
+        "users_skipped": 0,
+        "workers": max(1, workers),
+        "digest_users_due": 0,
+        "stale_menus": [],
+        "unavailable_menus": [],
+        **BatchSendResult().as_summary(),
+    }
+    if _nutrislice_disabled():
+        current_app.logger.info("DISABLE_NUTRISLICE=true – skipping the scheduled menu check.")
+        return summary
+
+    halls = _halls_needed()
+    if halls is not None and not halls:
+        return summary
+    try:
+        lookahead_days = current_app.config.get("MENU_LOOKAHEAD_DAYS", 3)
+        with _stage("fetch", stage_seconds), _build_client() as client:
+            snapshot = MenuSnapshot.build(client, lookahead_days, halls=halls)
+        summary.update(snapshot.degraded_menus())
+
+        with _stage("diff", stage_seconds):
+            changed, hashes = _changed_menus(snapshot, shard)
+            since = _scan_watermark(shard) if incremental else None
+    except Exception:
+        current_app.logger.exception("Error while building the menu snapshot")
+        METRICS.inc("menu_check_runs_total", kind="failed")
+        db.session.rollback()
+        # Matches stored by earlier runs are still due without fresh menus.
+        if send_email:
+            summary.update(send_due_digests(started_at, shard, stage_seconds))
+        summary["stage_seconds"] = {name: round(seconds, 4) for name, seconds in stage_seconds.items()}
+        return summary
+    summary["menus_changed"] = len(changed)
+    summary["menus_unchanged"] = len(hashes) - len(changed)
+    summary["stage_seconds"] = stage_seconds
+
+    if workers > 1:
+        partials = _scan_in_processes(
+            snapshot, changed, incremental, send_email, started_at, _split_shard(shard, workers), since
+        )
+    else:
+        partials = [_scan_users(snapshot, changed, incremental, send_email, started_at, shard, since)]
+    _merge_summaries(summary, partials)
+
+    with _stage("commit", stage_seconds):
+        if incremental:
+            db.session.merge(ScanWatermark(shard=_shard_key(shard), started_at=started_at))
+        _save_menu_versions(snapshot, hashes, shard)
+    users_with_favorites = db.session.query(func.count(User.id)).filter(User.favorites.any())
+    if shard is not None:
+        users_with_favorites = users_with_favorites.filter(User.id % shard[1] == shard[0])
+    summary["users_skipped"] = users_with_favorites.scalar() - summary["users_checked"]
+    summary["email_seconds"] = round(summary["email_seconds"], 3)
+    summary["menu_fetches"] = snapshot.fetches
+    summary["menu_cache_hits"] = snapshot.cache_hits
+    summary["stage_seconds"] = {name: round(seconds, 4) for name, seconds in stage_seconds.items()}
+
+    METRICS.inc("menu_check_runs_total", kind="incremental" if incremental else "full")
+    METRICS.inc("menu_check_matches_total", summary["total_matches"])
+    METRICS.observe("menu_check_stage_seconds", (datetime.utcnow() - started_at).total_seconds(), stage="total")
+    return summary
+
+
+def warm_menus(halls: Iterable[str] | None = None) -> dict:
+    """Fetch the lookahead window for ``halls`` into the menu cache.
+
+    Run ahead of ``run_menu_check`` so scans, manual checks and the menus API
+    read local data. Returns a summary of what was cached; like a scan, a
+    failure to build the snapshot (say, Nutrislice down with nothing cached)
+    is logged and leaves the summary empty.
+    """
+    summary = {
+        "locations": 0,
+        "menus": 0,
+        "items": 0,
+        "menu_fetches": 0,
+        "menu_cache_hits": 0,
+        "stale_menus": [],
+        "unavailable_menus": [],
+    }
+    if _nutrislice_disabled():
+        current_app.logger.info("DISABLE_NUTRISLICE=true – skipping menu warm-up.")
+        return summary
+
+    try:
+        lookahead_days = current_app.config.get("MENU_LOOKAHEAD_DAYS", 3)
+        with _stage("warm"), _build_client() as client:
+            snapshot = MenuSnapshot.build(client, lookahead_days, halls=halls)
+    except Exception:
+        current_app.logger.exception("Error while warming the menu cache")
+        return summary
+    summary.update(
+        locations=len(snapshot.locations),
+        menus=len(snapshot.menus),
+        items=sum(len(items) for items in snapshot.menus.values()),
+        menu_fetches=snapshot.fetches,
+        menu_cache_hits=snapshot.cache_hits,
+        **snapshot.degraded_menus(),
+    )
+    return summary
+
+
+def cached_menus(
+    target_date: date, halls: Iterable[str] | None = None, meals: Iterable[str] | None = None
+) -> MenuSnapshot:
+    """Return the menus for ``target_date`` from the menu cache alone, never calling Nutrislice.
+
+    Raises ``NutrisliceUnavailable`` when no locations have been cached yet.
+    """
+    cache = MenuCache(current_app.config["MENU_CACHE_TTL_SECONDS"])
+    with NutrisliceClient(base_url=current_app.config["NUTRISLICE_BASE_URL"], cache=cache, offline=True) as client:
+        return MenuSnapshot.build(client, 1, halls=halls, start_date=target_date, meals=meals)
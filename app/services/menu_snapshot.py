@@ -0,0 +1,173 @@
+"""Per-run menu snapshot shared by every user in a scan."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+import hashlib
+import logging
+from typing import Iterable, Iterator
+
+from app.services.fuzzy_index import FuzzySettings, MenuNameIndex
+from app.services.nutrislice_client import MenuItem, NutrisliceClient
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class MenuSnapshot:
+    """Menus for a lookahead window, fetched once and read by many users.
+
+    ``fetches`` counts upstream week requests made while building the snapshot,
+    ``cache_hits`` the weeks answered by the client's menu cache instead, and
+    ``hits`` the (location, date) menus served to users from memory.
+    ``stale_weeks`` maps weeks Nutrislice failed to serve, answered from an
+    older cache entry instead, to when that entry was cached;
+    ``unavailable_weeks`` holds failed weeks with no cached copy.
+    """
+
+    dates: list[date]
+    locations: list[dict]
+    menus: dict[tuple[int, date], list[MenuItem]] = field(default_factory=dict)
+    fetches: int = 0
+    cache_hits: int = 0
+    hits: int = 0
+    stale_weeks: dict[tuple[int, date], datetime | None] = field(default_factory=dict)
+    unavailable_weeks: set[tuple[int, date]] = field(default_factory=set)
+    _name_indexes: dict[FuzzySettings, MenuNameIndex] = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def build(
+        cls,
+        client: NutrisliceClient,
+        lookahead_days: int,
+        halls: Iterable[str] | None = None,
+        start_date: date | None = None,
+        meals: Iterable[str] | None = None,
+    ) -> "MenuSnapshot":
+        """Fetch locations once and the menus for every needed (location, date).
+
+        ``halls`` limits the snapshot to the named dining halls and ``meals``
+        to the named meals; ``None`` keeps every location Nutrislice reports
+        and every meal. A meal-filtered snapshot must not be used to update
+        stored menu hashes.
+        """
+        start_date = start_date or date.today()
+        dates = [start_date + timedelta(days=offset) for offset in range(lookahead_days)]
+        locations = client.get_locations()
+        if halls is not None:
+            wanted = set(halls)
+            locations = [location for location in locations if location["name"] in wanted]
+
+        snapshot = cls(dates=dates, locations=locations)
+        requests_before = client.stats["requests"]
+        cache_hits_before = client.stats["cache_hits"]
+        snapshot.menus = client.get_menus_for_locations(
+            [location["id"] for location in locations],
+            dates,
+            meals={meal.lower() for meal in meals} if meals is not None else None,
+        )
+        snapshot.fetches = client.stats["requests"] - requests_before
+        snapshot.cache_hits = client.stats["cache_hits"] - cache_hits_before
+        snapshot.stale_weeks = dict(client.stale_weeks)
+        snapshot.unavailable_weeks = set(client.unavailable_weeks)
+        if snapshot.stale_weeks or snapshot.unavailable_weeks:
+            LOGGER.warning(
+                "Nutrislice degraded: %s weeks served stale from cache, %s weeks unavailable",
+                len(snapshot.stale_weeks),
+                len(snapshot.unavailable_weeks),
+            )
+        LOGGER.info(
+            "Menu snapshot built: %s locations x %s days, %s fetches, %s cache hits",
+            len(locations),
+            len(dates),
+            snapshot.fetches,
+            snapshot.cache_hits,
+        )
+        return snapshot
+
+    def degraded_menus(self) -> dict[str, list[dict]]:
+        """Describe the stale and unavailable weeks for run reports."""
+        names = {location["id"]: location["name"] for location in self.locations}
+        return {
+            "stale_menus": [
+                {
+                    "dining_hall": names.get(location_id, f"Location {location_id}"),
+                    "week_start": week_start.isoformat(),
+                    "cached_at": cached_at.isoformat() if cached_at else None,
+                }
+                for (location_id, week_start), cached_at in sorted(self.stale_weeks.items())
+            ],
+            "unavailable_menus": [
+                {"dining_hall": names.get(location_id, f"Location {location_id}"), "week_start": week_start.isoformat()}
+                for location_id, week_start in sorted(self.unavailable_weeks)
+            ],
+        }
+
+    def iter_menus(
+        self, keys: set[tuple[int, date]] | None = None
+    ) -> Iterator[tuple[dict, date, list[MenuItem]]]:
+        """Yield ``(location, date, items)`` for every menu, or only those in ``keys``."""
+        for target_date in self.dates:
+            for location in self.locations:
+                key = (location["id"], target_date)
+                if keys is not None and key not in keys:
+                    continue
+                menu = self.menus.get(key)
+                if menu is not None:
+                    yield location, target_date, menu
+
+    def record_reads(self, selected_halls: set[str], keys: set[tuple[int, date]] | None = None) -> None:
+        """Count the menus a user with ``selected_halls`` was served from the snapshot."""
+        self.hits += sum(
+            1
+            for location, _, _ in self.iter_menus(keys)
+            if not selected_halls or location["name"] in selected_halls
+        )
+
+    def name_index(self, settings: FuzzySettings) -> MenuNameIndex:
+        """Return the fuzzy-matching index over every item name, built on first use."""
+        index = self._name_indexes.get(settings)
+        if index is None:
+            names = (item.normalized_name for _, _, items in self.iter_menus() for item in items)
+            index = self._name_indexes[settings] = MenuNameIndex(names, settings)
+        return index
+
+    def content_hashes(self) -> dict[tuple[int, date], str]:
+        """Return a stable hash of each (location, date) menu's items."""
+        hashes = {}
+        for key, items in self.menus.items():
+            digest = hashlib.sha1()
+            for meal, name in sorted((item.meal, item.name) for item in items):
+                digest.update(f"{meal}\x1f{name}\x1e".encode())
+            hashes[key] = digest.hexdigest()
+        return hashes
+
+    def served_halls_and_meals(
+        self, keys: set[tuple[int, date]] | None = None
+    ) -> tuple[set[str], set[str]]:
+        """Return hall names with menus and the lower-cased meals served in them."""
+        halls: set[str] = set()
+        meals: set[str] = set()
+        for location, _, items in self.iter_menus(keys):
+            if items:
+                halls.add(location["name"])
+                meals.update(item.meal.lower() for item in items)
+        return halls, meals
+
+    def items_for(self, selected_halls: set[str], selected_meals: set[str]) -> list[MenuItem]:
+        """Return snapshot items in the given halls and meals (empty sets mean all).
+
+        ``selected_meals`` must already be lower-cased.
+        """
+        items: list[MenuItem] = []
+        for location, _, menu in self.iter_menus():
+            if selected_halls and location["name"] not in selected_halls:
+                continue
+            self.hits += 1
+            for item in menu:
+                if selected_meals and item.meal.lower() not in selected_meals:
+                    continue
+                items.append(item)
+        return items
+
@@ -0,0 +1,148 @@
+"""In-process counters and latency histograms for menu checks."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+import threading
+import time
+from typing import Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: tuple[str, str] | None = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.count = 0
+        self.total = 0.0
+
+
+class MetricsRegistry:
+    """Thread-safe counters and fixed-bucket histograms keyed by name and labels.
+
+    Metrics are created on first use; ``describe`` attaches help text shown
+    in the Prometheus exposition.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._help: dict[str, str] = {}
+        self._counters: dict[str, dict[LabelKey, float]] = {}
+        self._histograms: dict[str, dict[LabelKey, _Histogram]] = {}
+
+    def describe(self, name: str, help_text: str) -> None:
+        self._help[name] = help_text
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets))
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                histogram.counts[index] += 1
+            histogram.count += 1
+            histogram.total += value
+
+    @contextmanager
+    def timed(self, name: str, **labels) -> Iterator[None]:
+        """Observe the wall time of the ``with`` block, whether or not it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serialisable copy of every series."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                for name, series in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": histogram.count,
+                        "sum": round(histogram.total, 6),
+                        "mean": round(histogram.total / histogram.count, 6) if histogram.count else 0.0,
+                    }
+                    for key, histogram in series.items()
+                ]
+                for name, series in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def render_prometheus(self) -> str:
+        """Render every series in the Prometheus text exposition format."""
+        lines: list[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {histogram.total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+METRICS.describe("nutrislice_request_seconds", "Latency of Nutrislice HTTP requests.")
+METRICS.describe("nutrislice_requests_total", "Nutrislice HTTP requests by response status.")
+METRICS.describe("nutrislice_request_errors_total", "Nutrislice requests that raised before a response.")
+METRICS.describe("nutrislice_retries_total", "Nutrislice requests retried after a transient failure.")
+METRICS.describe("nutrislice_circuit_rejections_total", "Nutrislice requests refused while the circuit was open.")
+METRICS.describe("menu_cache_lookups_total", "Menu resource lookups by cache outcome.")
+METRICS.describe("menu_check_stage_seconds", "Wall time of each menu check stage.")
+METRICS.describe("menu_check_runs_total", "Completed menu check runs by kind.")
+METRICS.describe("menu_check_matches_total", "Matches found by menu checks.")
+METRICS.describe("smtp_send_seconds", "Latency of individual SMTP sends.")
+METRICS.describe("smtp_messages_total", "Alert emails by delivery outcome.")
+METRICS.describe("smtp_connections_total", "SMTP connections opened.")
+METRICS.describe("email_digest_fragments_total", "Alert digest sections rendered or reused from cache.")
+METRICS.describe("dashboard_cache_lookups_total", "Dashboard data lookups by cache outcome.")
@@ -2,25 +2,52 @@
 
 from __future__ import annotations
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from datetime import date
+from datetime import date, datetime, timedelta
+from functools import lru_cache
 import logging
+import random
 import re
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Collection, Iterable, Iterator
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from app.services.metrics import METRICS
+
+if TYPE_CHECKING:
+    from app.services.menu_cache import CachedPayload, MenuCache
 
 LOGGER = logging.getLogger(__name__)
 
 BASE_URL = "https://wisc-housingdining.nutrislice.com"
-API_LOCATIONS_URL = f"{BASE_URL}/api/menu/api/sites/"
-API_MENU_URL_TEMPLATE = (
-    f"{BASE_URL}/api/menu/api/weeks/school/{{location_id}}/menu-type/{{menu_type_id}}/{{iso_date}}/"
-)
+API_LOCATIONS_PATH = "/api/menu/api/sites/"
+API_MENU_PATH_TEMPLATE = "/api/menu/api/weeks/school/{location_id}/menu-type/{menu_type_id}/{iso_date}/"
 DEFAULT_MENU_TYPE_ID = 1714
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF_SECONDS = 0.5
+MAX_BACKOFF_SECONDS = 8.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+NORMALIZE_CACHE_SIZE = 16384
 
+_WHITESPACE_RE = re.compile(r"\s+")
+_DISALLOWED_RE = re.compile(r"[^a-z0-9 ]")
 
-@dataclass
+
+@dataclass(slots=True)
 class MenuItem:
+    """One item on one day's menu.
+
+    Items are shared by the snapshot, the matcher and alert emails rather
+    than copied, and ``iter_week_items`` interns the repeated strings.
+    """
+
     name: str
     normalized_name: str
     meal: str
@@ -28,59 +55,430 @@ class MenuItem:
     dining_hall: str
 
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def normalize_item_name(name: str) -> str:
-    """Normalize menu names for case-insensitive and whitespace-tolerant matching."""
-    compact = re.sub(r"\s+", " ", name.strip().lower())
-    return re.sub(r"[^a-z0-9 ]", "", compact)
+    """Normalize menu names for case-insensitive and whitespace-tolerant matching.
+
+    Menu names repeat across days and halls, so results are kept in a bounded
+    LRU cache; repeated names also share one normalized string.
+    """
+    compact = _WHITESPACE_RE.sub(" ", name.strip().lower())
+    return _DISALLOWED_RE.sub("", compact)
+
+
+class NutrisliceUnavailable(requests.RequestException):
+    """Raised instead of a request while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Fails Nutrislice requests fast after repeated errors.
+
+    After ``failure_threshold`` consecutive failed attempts the breaker opens
+    and ``allow`` refuses every request for ``reset_seconds``. It then lets a
+    single probe through: success closes it, failure opens it again. One
+    breaker is shared by every client in the process.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 60.0, clock=time.monotonic):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            if self._probing or self._clock() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self.OPEN
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or self._clock() - self._opened_at < self.reset_seconds:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    LOGGER.warning("Nutrislice circuit opened after %s failures", self._failures)
+                self._opened_at = self._clock()
+                self._probing = False
 
 
 class NutrisliceClient:
-    """Client for Nutrislice public JSON endpoints."""
+    """Client for Nutrislice public JSON endpoints.
+
+    Requests share one pooled ``requests.Session``; bulk week fetches run on a
+    thread pool capped at ``max_workers`` concurrent requests. With a ``cache``
+    fresh responses are served locally and stale ones revalidated with
+    ETag/Last-Modified. ``stats`` counts upstream requests and cache outcomes.
+
+    Connection errors, timeouts, 429 and 5xx responses are retried up to
+    ``retries`` times with full-jitter exponential backoff, and every attempt
+    is reported to the optional ``breaker``. A week that still fails is served
+    from the cache however old it is and recorded in ``stale_weeks``; with no
+    cached copy it is left out of the results and recorded in
+    ``unavailable_weeks``. An ``offline`` client never calls Nutrislice and
+    answers from the cache alone, whatever the age of its entries.
+    """
 
-    def __init__(self, timeout: int = 10):
+    def __init__(
+        self,
+        timeout: float = 10,
+        base_url: str = BASE_URL,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        cache: MenuCache | None = None,
+        retries: int = DEFAULT_RETRIES,
+        backoff_seconds: float = DEFAULT_BACKOFF_SECONDS,
+        breaker: CircuitBreaker | None = None,
+        offline: bool = False,
+    ):
         self.timeout = timeout
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max(1, max_workers)
+        self.cache = cache
+        self.retries = max(0, retries)
+        self.backoff_seconds = backoff_seconds
+        self.breaker = breaker
+        self.offline = offline
+        self.stats: Counter[str] = Counter()
+        self.stale_resources: dict[str, datetime | None] = {}
+        self.failed_resources: set[str] = set()
+        self.stale_weeks: dict[tuple[int, date], datetime | None] = {}
+        self.unavailable_weeks: set[tuple[int, date]] = set()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def __enter__(self) -> "NutrisliceClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _send(self, url: str, headers: dict[str, str] | None = None) -> requests.Response:
+        started = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as exc:
+            METRICS.inc("nutrislice_request_errors_total", error=type(exc).__name__)
+            raise
+        elapsed = time.perf_counter() - started
+        METRICS.observe("nutrislice_request_seconds", elapsed)
+        METRICS.inc("nutrislice_requests_total", status=response.status_code)
+        LOGGER.info("GET %s -> %s in %.1f ms", url, response.status_code, elapsed * 1000)
+        return response
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(MAX_BACKOFF_SECONDS, self.backoff_seconds * 2**attempt))
+
+    def _get(self, url: str, headers: dict[str, str] | None = None) -> requests.Response:
+        """GET ``url``, retrying transient failures; raises once retries are spent."""
+        attempt = 0
+        while True:
+            if self.breaker is not None and not self.breaker.allow():
+                METRICS.inc("nutrislice_circuit_rejections_total")
+                raise NutrisliceUnavailable(f"Nutrislice circuit is open; skipped GET {url}")
+            try:
+                response = self._send(url, headers=headers)
+            except requests.RequestException:
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+                if attempt >= self.retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    if self.breaker is not None:
+                        self.breaker.record_success()
+                    return response
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+                if attempt >= self.retries:
+                    response.raise_for_status()
+            METRICS.inc("nutrislice_retries_total")
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def _request_many(
+        self, resources: list[str], cached: dict[str, CachedPayload]
+    ) -> list[requests.Response | requests.RequestException]:
+        """GET each resource, concurrently when there are several, revalidating cached ones.
+
+        A resource whose retries are exhausted yields its exception in place
+        of a response, so one failing week does not sink the others.
+        """
+
+        def request(resource: str) -> requests.Response | requests.RequestException:
+            headers = {}
+            entry = cached.get(resource)
+            if entry is not None:
+                if entry.etag:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified:
+                    headers["If-Modified-Since"] = entry.last_modified
+            try:
+                return self._get(self.base_url + resource, headers=headers)
+            except requests.RequestException as exc:
+                return exc
+
+        self.stats["requests"] += len(resources)
+        if len(resources) <= 1 or self.max_workers == 1:
+            return [request(resource) for resource in resources]
+
+        workers = min(self.max_workers, len(resources))
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = list(executor.map(request, resources))
+        LOGGER.info(
+            "Fetched %s resources with %s workers in %.1f ms",
+            len(resources),
+            workers,
+            (time.perf_counter() - started) * 1000,
+        )
+        return responses
+
+    def _fetch_payloads(self, resources: dict[str, dict]) -> dict[str, dict | list | None]:
+        """Return the JSON body for each resource path, ``None`` when it is missing upstream.
+
+        ``resources`` maps each path to the cache columns stored alongside it.
+        A resource that exhausts its retries, gets an error status or returns
+        a body that is not JSON is served from its cached copy and recorded
+        in ``stale_resources``; with no copy it is absent from the result and
+        added to ``failed_resources``.
+        """
+        cached = self.cache.lookup(resources) if self.cache is not None else {}
+        bodies: dict[str, dict | list | None] = {}
+        pending: list[str] = []
+        for resource in resources:
+            entry = cached.get(resource)
+            if entry is not None and (entry.fresh or self.offline):
+                bodies[resource] = entry.payload
+                self.stats["cache_hits"] += 1
+                METRICS.inc("menu_cache_lookups_total", outcome="hit")
+            else:
+                pending.append(resource)
+                if self.cache is not None:
+                    METRICS.inc("menu_cache_lookups_total", outcome="stale" if entry else "miss")
+        if self.offline:
+            self.failed_resources.update(pending)
+            return bodies
+
+        updates: list[dict] = []
+        revalidated: list[str] = []
+        for resource, response in zip(pending, self._request_many(pending, cached)):
+            entry = cached.get(resource)
+            error = response
+            if isinstance(response, requests.Response):
+                if response.status_code == 304 and entry is not None:
+                    bodies[resource] = entry.payload
+                    revalidated.append(resource)
+                    self.stats["cache_revalidated"] += 1
+                    METRICS.inc("menu_cache_lookups_total", outcome="revalidated")
+                    continue
+                if response.status_code == 404:
+                    bodies[resource] = None
+                    continue
+                try:
+                    response.raise_for_status()
+                    payload = response.json()
+                except (requests.RequestException, ValueError) as exc:
+                    error = exc
+                else:
+                    bodies[resource] = payload
+                    updates.append(
+                        {
+                            "resource": resource,
+                            "payload": payload,
+                            "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified"),
+                            **resources[resource],
+                        }
+                    )
+                    continue
+
+            if entry is None:
+                LOGGER.warning("Nutrislice unavailable for %s: %s", resource, error)
+                self.failed_resources.add(resource)
+                self.stats["unavailable"] += 1
+                continue
+            LOGGER.warning("Serving %s cached at %s: %s", resource, entry.fetched_at, error)
+            bodies[resource] = entry.payload
+            self.stale_resources[resource] = entry.fetched_at
+            self.stats["stale_served"] += 1
+            METRICS.inc("menu_cache_lookups_total", outcome="stale_fallback")
+
+        if self.cache is not None:
+            self.cache.save(updates, revalidated)
+        return bodies
 
     def get_locations(self) -> list[dict]:
-        response = requests.get(API_LOCATIONS_URL, timeout=self.timeout)
-        response.raise_for_status()
-        payload = response.json()
-        locations = payload.get("objects", payload if isinstance(payload, list) else [])
+        bodies = self._fetch_payloads({API_LOCATIONS_PATH: {}})
+        if API_LOCATIONS_PATH not in bodies:
+            raise NutrisliceUnavailable("Nutrislice locations are unavailable and not cached")
+        payload = bodies[API_LOCATIONS_PATH] or []
+        locations = payload.get("objects", []) if isinstance(payload, dict) else payload
         return [
             {"id": loc.get("id"), "name": loc.get("name", "Unknown")}
             for loc in locations
             if loc.get("id")
         ]
 
+    def get_week_menu(self, location_id: int, week_start: date) -> list[MenuItem]:
+        """Return every item in the Nutrislice week starting ``week_start``, dated by day."""
+        return self.fetch_weeks([(location_id, week_start)]).get((location_id, week_start), [])
+
+    def _fetch_week_bodies(self, keys: Iterable[tuple[int, date]]) -> dict[tuple[int, date], dict | None]:
+        """Fetch week payloads concurrently and through the cache, ``None`` when missing upstream.
+
+        Unavailable weeks are left out; see ``stale_weeks`` and ``unavailable_weeks``.
+        """
+        resources = {
+            API_MENU_PATH_TEMPLATE.format(
+                location_id=location_id, menu_type_id=DEFAULT_MENU_TYPE_ID, iso_date=week_start.isoformat()
+            ): {"location_id": location_id, "menu_type_id": DEFAULT_MENU_TYPE_ID, "week_start": week_start}
+            for location_id, week_start in keys
+        }
+        bodies = self._fetch_payloads(resources)
+
+        weeks: dict[tuple[int, date], dict | None] = {}
+        for resource, meta in resources.items():
+            key = (meta["location_id"], meta["week_start"])
+            if resource in self.failed_resources:
+                self.unavailable_weeks.add(key)
+                continue
+            if resource in self.stale_resources:
+                self.stale_weeks[key] = self.stale_resources[resource]
+            weeks[key] = bodies[resource]
+            if weeks[key] is None:
+                LOGGER.warning("Menu not found for location_id=%s in week=%s", key[0], key[1].isoformat())
+        return weeks
+
+    def fetch_weeks(self, keys: Iterable[tuple[int, date]]) -> dict[tuple[int, date], list[MenuItem]]:
+        """Fetch many ``(location_id, week_start)`` weeks, concurrently and through the cache.
+
+        Unavailable weeks are left out; see ``stale_weeks`` and ``unavailable_weeks``.
+        """
+        return {
+            key: parse_week_payload(body, *key) if body is not None else []
+            for key, body in self._fetch_week_bodies(keys).items()
+        }
+
+    def get_menus_for_locations(
+        self, location_ids: Iterable[int], dates: Iterable[date], meals: Collection[str] | None = None
+    ) -> dict[tuple[int, date], list[MenuItem]]:
+        """Return items per ``(location_id, date)``, requesting each location's weeks once.
+
+        Only items on ``dates`` and, when given, in ``meals`` (lower-cased) are
+        built; the rest of each week is skipped while parsing. Dates in weeks
+        that could not be fetched or served from cache are omitted.
+        """
+        location_ids = list(location_ids)
+        dates = list(dates)
+        bodies = self._fetch_week_bodies(
+            (location_id, start) for location_id in location_ids for start in week_starts_for(dates)
+        )
+        menus: dict[tuple[int, date], list[MenuItem]] = {
+            (location_id, target_date): []
+            for location_id in location_ids
+            for target_date in dates
+            if (location_id, week_start_for(target_date)) in bodies
+        }
+        wanted_dates = set(dates)
+        for (location_id, week_start), body in bodies.items():
+            if body is None:
+                continue
+            for item in iter_week_items(body, location_id, week_start, wanted_dates, meals):
+                menu = menus.get((location_id, item.date))
+                if menu is not None:
+                    menu.append(item)
+        return menus
+
+    def get_menus_for_dates(self, location_id: int, dates: Iterable[date]) -> dict[date, list[MenuItem]]:
+        """Return items per date, requesting each week the dates span only once."""
+        return {
+            target_date: items
+            for (_, target_date), items in self.get_menus_for_locations([location_id], dates).items()
+        }
+
     def get_menu_for_date_and_location(self, target_date: date, location_id: int) -> list[MenuItem]:
         """Return structured menu items for a date and location."""
-        iso_date = target_date.isoformat()
-        url = API_MENU_URL_TEMPLATE.format(
-            location_id=location_id, menu_type_id=DEFAULT_MENU_TYPE_ID, iso_date=iso_date
-        )
-        response = requests.get(url, timeout=self.timeout)
-        if response.status_code == 404:
-            LOGGER.warning("Menu not found for location_id=%s on date=%s", location_id, iso_date)
-            return []
-        response.raise_for_status()
-        payload = response.json()
-
-        dining_hall_name = payload.get("site_name", f"Location {location_id}")
-        items: list[MenuItem] = []
-
-        for day in payload.get("days", []):
-            for meal in day.get("menu_items", []):
-                meal_name = meal.get("meal", "Unknown")
-                for item in meal.get("items", []):
-                    item_name = item.get("name", "")
-                    if not item_name:
-                        continue
-                    items.append(
-                        MenuItem(
-                            name=item_name,
-                            normalized_name=normalize_item_name(item_name),
-                            meal=meal_name,
-                            date=target_date,
-                            dining_hall=dining_hall_name,
-                        )
-                    )
-        return items
+        return self.get_menus_for_dates(location_id, [target_date]).get(target_date, [])
+
+
+def week_start_for(target_date: date) -> date:
+    """Return the Sunday that starts the Nutrislice week containing ``target_date``."""
+    return target_date - timedelta(days=(target_date.weekday() + 1) % 7)
+
+
+def week_starts_for(dates: Iterable[date]) -> list[date]:
+    """Return the distinct week starts spanned by ``dates``, in order."""
+    return sorted({week_start_for(target_date) for target_date in dates})
+
+
+def parse_week_payload(payload: dict, location_id: int, week_start: date) -> list[MenuItem]:
+    """Split a week payload's ``days`` into menu items stamped with their own date."""
+    return list(iter_week_items(payload, location_id, week_start))
+
+
+def iter_week_items(
+    payload: dict,
+    location_id: int,
+    week_start: date,
+    dates: Collection[date] | None = None,
+    meals: Collection[str] | None = None,
+) -> Iterator[MenuItem]:
+    """Yield a week payload's menu items one at a time.
+
+    Days not in ``dates`` and meals whose lower-cased name is not in
+    ``meals`` are skipped before any of their items are read; ``None`` keeps
+    everything.
+    """
+    dining_hall_name = sys.intern(payload.get("site_name", f"Location {location_id}"))
+
+    for offset, day in enumerate(payload.get("days", [])):
+        day_date = day.get("date")
+        menu_date = date.fromisoformat(day_date) if day_date else week_start + timedelta(days=offset)
+        if dates is not None and menu_date not in dates:
+            continue
+        for meal in day.get("menu_items", []):
+            meal_name = meal.get("meal", "Unknown")
+            if meals is not None and meal_name.lower() not in meals:
+                continue
+            meal_name = sys.intern(meal_name)
+            for item in meal.get("items", []):
+                item_name = item.get("name", "")
+                if not item_name:
+                    continue
+                item_name = sys.intern(item_name)
+                yield MenuItem(
+                    name=item_name,
+                    normalized_name=normalize_item_name(item_name),
+                    meal=meal_name,
+                    date=menu_date,
+                    dining_hall=dining_hall_name,
+                )
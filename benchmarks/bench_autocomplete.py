@@ -0,0 +1,69 @@
+"""Micro-benchmark favorite autocomplete lookups against a full prefix index.
+
+Usage::
+
+    python -m benchmarks.bench_autocomplete --names 20000 --queries 10000
+
+Builds a ``PrefixIndex`` holding ``names`` synthetic menu names, then times
+``suggest`` for random one- to three-letter word prefixes of them, the way
+the dashboard's favorite field queries as a user types.
+"""
+
+from __future__ import annotations
+
+import argparse
+from datetime import date, timedelta
+import json
+import random
+import time
+
+from app.services.autocomplete import PrefixIndex
+from app.services.nutrislice_client import normalize_item_name
+from benchmarks.synthetic import make_menu_names
+
+
+def run(names: int, queries: int, limit: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    display_names = list(dict.fromkeys(make_menu_names(rng, names * 2)))[:names]
+    start_date = date(2026, 2, 1)
+    items = [
+        (normalize_item_name(name), name, start_date + timedelta(days=index % 14))
+        for index, name in enumerate(display_names)
+    ]
+
+    index = PrefixIndex(max_names=names)
+    started = time.perf_counter()
+    index.add(items)
+    build_seconds = time.perf_counter() - started
+
+    prefixes = []
+    for _ in range(queries):
+        word = rng.choice(rng.choice(display_names).split())
+        prefixes.append(word[: rng.randint(1, 3)])
+    started = time.perf_counter()
+    suggested = sum(len(index.suggest(prefix, limit)) for prefix in prefixes)
+    lookup_seconds = time.perf_counter() - started
+
+    return {
+        "names": len(index),
+        "queries": queries,
+        "limit": limit,
+        "build_seconds": round(build_seconds, 4),
+        "lookup_seconds": round(lookup_seconds, 4),
+        "microseconds_per_lookup": round(lookup_seconds / queries * 1e6, 1),
+        "suggestions_per_lookup": round(suggested / queries, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.names, args.queries, args.limit, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
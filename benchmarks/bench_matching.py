@@ -0,0 +1,103 @@
+"""Compare the batch favorite matcher with the original per-user substring loop.
+
+Usage::
+
+    python -m benchmarks.bench_matching --users 10000 --favorites 20 --menu-items 2000
+
+The original loop is linear in the number of users, so it is timed on a
+sample of ``--baseline-sample`` users and extrapolated to the full count.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from app.services.favorite_index import FavoriteMatcher
+from app.services.nutrislice_client import normalize_item_name
+from benchmarks.synthetic import make_favorite_name, make_menu_names
+
+
+def make_favorites(rng: random.Random, users: int, per_user: int) -> list[list[SimpleNamespace]]:
+    favorites = []
+    for user_id in range(1, users + 1):
+        user_favorites = []
+        for _ in range(per_user):
+            name = make_favorite_name(rng)
+            user_favorites.append(
+                SimpleNamespace(user_id=user_id, item_name=name, normalized_name=normalize_item_name(name))
+            )
+        favorites.append(user_favorites)
+    return favorites
+
+
+def baseline_loop(menu_names: list[str], user_favorites: list[SimpleNamespace]) -> int:
+    """The pre-index matching loop from ``find_matches_for_user``."""
+    favorite_lookup = {fav.normalized_name: fav.item_name for fav in user_favorites}
+    found = 0
+    for name in menu_names:
+        normalized_menu = normalize_item_name.__wrapped__(name)
+        for normalized_fav in favorite_lookup:
+            if normalized_fav and normalized_fav in normalized_menu:
+                found += 1
+    return found
+
+
+def run(users: int, favorites: int, menu_items: int, baseline_sample: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    menu_names = make_menu_names(rng, menu_items)
+    all_favorites = make_favorites(rng, users, favorites)
+    sample = all_favorites[: min(baseline_sample, users)]
+
+    started = time.perf_counter()
+    sample_matches = sum(baseline_loop(menu_names, user_favorites) for user_favorites in sample)
+    baseline_seconds = (time.perf_counter() - started) * users / len(sample)
+
+    started = time.perf_counter()
+    matcher = FavoriteMatcher(fav for user_favorites in all_favorites for fav in user_favorites)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sample_ids = {user_favorites[0].user_id for user_favorites in sample}
+    engine_matches = 0
+    engine_sample_matches = 0
+    for name in menu_names:
+        for user_id, _ in matcher.match(normalize_item_name(name)):
+            engine_matches += 1
+            if user_id in sample_ids:
+                engine_sample_matches += 1
+    scan_seconds = time.perf_counter() - started
+
+    if engine_sample_matches != sample_matches:
+        raise AssertionError(f"engine found {engine_sample_matches} sample matches, baseline {sample_matches}")
+
+    return {
+        "users": users,
+        "favorites_per_user": favorites,
+        "menu_items": menu_items,
+        "distinct_patterns": matcher.pattern_count,
+        "baseline_sample_users": len(sample),
+        "baseline_seconds_extrapolated": round(baseline_seconds, 3),
+        "engine_build_seconds": round(build_seconds, 3),
+        "engine_scan_seconds": round(scan_seconds, 3),
+        "engine_total_matches": engine_matches,
+        "speedup": round(baseline_seconds / (build_seconds + scan_seconds), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--favorites", type=int, default=20)
+    parser.add_argument("--menu-items", type=int, default=2_000)
+    parser.add_argument("--baseline-sample", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.favorites, args.menu_items, args.baseline_sample, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Micro-benchmark menu name normalization before and after memoization.
+
+Usage::
+
+    python -m benchmarks.bench_normalize --users 1000 --distinct-names 600 --menu-items 3000
+
+``legacy`` is the original two ``re.sub`` calls with pattern strings,
+``precompiled`` the same rules with module-level patterns and no cache, and
+``cached`` the shipped ``normalize_item_name``. Each is timed over the names a
+per-user scan used to normalize: every menu item, once per user.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import time
+
+from app.services.nutrislice_client import normalize_item_name
+from benchmarks.synthetic import make_menu_names
+
+
+def legacy_normalize(name: str) -> str:
+    compact = re.sub(r"\s+", " ", name.strip().lower())
+    return re.sub(r"[^a-z0-9 ]", "", compact)
+
+
+def time_calls(normalize, names: list[str], repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for name in names:
+            normalize(name)
+    return time.perf_counter() - started
+
+
+def run(users: int, distinct_names: int, menu_items: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    rotation = [
+        f"{name}  w/ Sauce!" if index % 5 == 0 else name
+        for index, name in enumerate(make_menu_names(rng, distinct_names))
+    ]
+    names = rng.choices(rotation, k=menu_items)
+
+    results = {
+        "users": users,
+        "distinct_names": distinct_names,
+        "menu_items": menu_items,
+        "calls": users * menu_items,
+    }
+    normalize_item_name.cache_clear()
+    for label, normalize in (
+        ("legacy", legacy_normalize),
+        ("precompiled", normalize_item_name.__wrapped__),
+        ("cached", normalize_item_name),
+    ):
+        results[f"{label}_seconds"] = round(time_calls(normalize, names, users), 4)
+    if any(legacy_normalize(name) != normalize_item_name(name) for name in rotation):
+        raise AssertionError("cached normalization disagrees with the legacy rules")
+
+    # The matcher now receives normalized names with the menu, so a scan costs
+    # one normalization per distinct name rather than one per item per user.
+    normalize_item_name.cache_clear()
+    results["carried_seconds"] = round(time_calls(normalize_item_name, names, 1), 4)
+    results["speedup_cached"] = round(results["legacy_seconds"] / results["cached_seconds"], 1)
+    results["speedup_carried"] = round(results["legacy_seconds"] / max(results["carried_seconds"], 1e-9), 1)
+    info = normalize_item_name.cache_info()
+    results["cache_hits"], results["cache_misses"] = info.hits, info.misses
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--distinct-names", type=int, default=600)
+    parser.add_argument("--menu-items", type=int, default=3_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.distinct_names, args.menu_items, args.seed), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Per-stage timings of the scan pipeline at several synthetic scales.
+
+Usage::
+
+    python -m benchmarks.bench_pipeline --scales 100x5,1000x10,5000x20 --output bench.jsonl
+
+Each scale seeds a fresh database (a temporary SQLite file unless
+``--database`` points at a dedicated, disposable PostgreSQL database — its
+tables are dropped), serves menus from a local stub Nutrislice server and
+emits one JSON line per stage so results can be diffed across commits.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import smtplib
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+
+from app import create_app
+from app.models import MenuMatch, db
+from app.services import menu_matcher
+from app.services.email_service import DigestRenderer, EmailClient, OutgoingEmail, build_match_email_content
+from app.services.menu_snapshot import MenuSnapshot
+from app.services.nutrislice_client import NutrisliceClient, normalize_item_name
+from benchmarks.synthetic import StubNutrisliceServer, seed_users
+
+
+class NullSMTP:
+    """Accepts every message without network I/O, isolating client-side send cost."""
+
+    def __init__(self, host, port):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        pass
+
+    def quit(self):
+        pass
+
+    close = quit
+
+
+@contextmanager
+def null_smtp():
+    original = smtplib.SMTP
+    smtplib.SMTP = NullSMTP
+    try:
+        yield
+    finally:
+        smtplib.SMTP = original
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+
+
+def run_scale(users: int, favorites: int, database: str, stub: StubNutrisliceServer, lookahead_days: int) -> dict:
+    app = create_app(
+        {
+            "SQLALCHEMY_DATABASE_URI": database,
+            "NUTRISLICE_BASE_URL": stub.base_url,
+            "MENU_LOOKAHEAD_DAYS": lookahead_days,
+            "MENU_CACHE_TTL_SECONDS": 0,
+        }
+    )
+    timer = StageTimer()
+    counts: dict[str, int] = {}
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        with timer.stage("seed"):
+            seed_users(users, favorites)
+
+        with timer.stage("fetch"):
+            with NutrisliceClient(base_url=stub.base_url) as client:
+                snapshot = MenuSnapshot.build(client, lookahead_days)
+        names = [item.name for _, _, items in snapshot.iter_menus() for item in items]
+        counts["menu_items"] = len(names)
+
+        with timer.stage("normalize"):
+            for name in names:
+                normalize_item_name(name)
+
+        alerts: list[OutgoingEmail] = []
+        renderer = DigestRenderer()
+        chunks = menu_matcher._iter_user_chunks(snapshot, app.config["SCAN_CHUNK_SIZE"])
+        while True:
+            with timer.stage("load_users"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            with timer.stage("match"):
+                matches_by_user = menu_matcher.match_snapshot(snapshot, chunk)
+            with timer.stage("persist"):
+                menu_matcher.store_matches(matches_by_user)
+                db.session.commit()
+            with timer.stage("email_render"):
+                for user in chunk:
+                    if matches_by_user[user.id]:
+                        subject, html_body, text_body = build_match_email_content(
+                            user.email, matches_by_user[user.id], "http://localhost/dashboard", renderer
+                        )
+                        alerts.append(OutgoingEmail(user.email, subject, html_body, text_body))
+        counts["matches"] = db.session.query(MenuMatch).count()
+        counts["alerts"] = len(alerts)
+
+        with timer.stage("email_send"), null_smtp():
+            EmailClient("localhost", 25, "", "", "alerts@example.com").send_batch(alerts)
+
+        MenuMatch.query.delete()
+        db.session.commit()
+        with timer.stage("end_to_end"):
+            summary = menu_matcher.run_menu_check_for_all_users(send_email=False)
+        counts["end_to_end_matches"] = summary["total_matches"]
+        db.engine.dispose()
+
+    return {"seconds": {name: round(value, 4) for name, value in timer.seconds.items()}, "counts": counts}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="100x5,1000x10,5000x20", help="Comma-separated USERSxFAVORITES")
+    parser.add_argument("--database", help="Disposable database URL; defaults to a temporary SQLite file")
+    parser.add_argument("--lookahead-days", type=int, default=3)
+    parser.add_argument("--output", help="Append JSON lines here as well as printing them")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    revision = _git_revision()
+    with StubNutrisliceServer() as stub, tempfile.TemporaryDirectory() as tmpdir:
+        for scale in args.scales.split(","):
+            users, favorites = (int(part) for part in scale.lower().split("x"))
+            database = args.database or f"sqlite:///{os.path.join(tmpdir, f'bench_{users}x{favorites}.db')}"
+            result = run_scale(users, favorites, database, stub, args.lookahead_days)
+            for stage, seconds in result["seconds"].items():
+                line = json.dumps(
+                    {
+                        "revision": revision,
+                        "users": users,
+                        "favorites_per_user": favorites,
+                        "stage": stage,
+                        "seconds": seconds,
+                        **result["counts"],
+                    }
+                )
+                print(line)
+                if args.output:
+                    with open(args.output, "a", encoding="utf-8") as handle:
+                        handle.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Synthetic users, favorites and Nutrislice payloads for benchmarks."""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import threading
+
+from sqlalchemy import insert
+
+from app.models import Favorite, User, UserDiningHall, UserMeal, db
+from app.services.nutrislice_client import API_LOCATIONS_PATH, normalize_item_name
+
+WORDS = (
+    "chicken beef pork tofu turkey salmon shrimp veggie black bean cheese mac pasta penne "
+    "alfredo marinara pesto pizza pepperoni margherita flatbread burger cheeseburger sandwich "
+    "wrap taco burrito quesadilla nachos rice fried brown jasmine noodle ramen pho curry tikka "
+    "masala korma teriyaki orange sesame general tso spicy bbq buffalo grilled roasted baked "
+    "crispy garlic lemon herb honey mustard ranch caesar garden greek cobb salad soup tomato "
+    "basil minestrone chili cornbread potato mashed sweet fries tots waffle pancake french toast "
+    "omelet egg scrambled bacon sausage hash brown biscuit gravy oatmeal yogurt parfait fruit "
+    "cookie brownie cake pie apple cherry chocolate chip vanilla curds sushi poke bowl"
+).split()
+
+HALLS = ["Gordon Avenue Market", "Four Lakes Market", "Rheta's Market", "Liz's Market"]
+MEALS = ["Breakfast", "Lunch", "Dinner"]
+
+
+def make_menu_names(rng: random.Random, count: int) -> list[str]:
+    return [" ".join(rng.choices(WORDS, k=rng.randint(2, 4))).title() for _ in range(count)]
+
+
+def make_favorite_name(rng: random.Random) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.choice((1, 1, 2)))).title()
+
+
+def seed_users(users: int, favorites_per_user: int, seed: int = 7, batch_size: int = 1000) -> None:
+    """Bulk-insert ``users`` users with random hall/meal selections and favorites."""
+    rng = random.Random(seed)
+    created_at = datetime.utcnow() - timedelta(days=1)
+    for start in range(0, users, batch_size):
+        ids = range(start + 1, min(start + batch_size, users) + 1)
+        db.session.execute(
+            insert(User),
+            [{"id": user_id, "email": f"user{user_id}@wisc.edu", "password_hash": "x"} for user_id in ids],
+        )
+        halls, meals, favorites = [], [], []
+        for user_id in ids:
+            for position, hall in enumerate(rng.sample(HALLS, rng.randint(0, 3))):
+                halls.append({"user_id": user_id, "dining_hall": hall, "position": position})
+            for position, meal in enumerate(rng.sample(MEALS, rng.randint(0, 2))):
+                meals.append({"user_id": user_id, "meal": meal, "position": position})
+            for _ in range(favorites_per_user):
+                name = make_favorite_name(rng)
+                favorites.append(
+                    {
+                        "user_id": user_id,
+                        "item_name": name,
+                        "normalized_name": normalize_item_name(name),
+                        "created_at": created_at,
+                    }
+                )
+        for model, rows in ((UserDiningHall, halls), (UserMeal, meals), (Favorite, favorites)):
+            if rows:
+                db.session.execute(insert(model), rows)
+        db.session.commit()
+
+
+def week_payload(location_id: int, hall: str, week_start: date, items_per_meal: int = 40) -> dict:
+    """A Nutrislice-shaped week: seven days, three meals, stations' worth of items."""
+    rng = random.Random(f"{location_id}-{week_start.isoformat()}")
+    rotation = make_menu_names(rng, items_per_meal * 6)
+    days = []
+    for offset in range(7):
+        day = week_start + timedelta(days=offset)
+        days.append(
+            {
+                "date": day.isoformat(),
+                "menu_items": [
+                    {
+                        "meal": meal,
+                        "items": [
+                            {"name": name, "description": "", "station": f"Station {index % 6}"}
+                            for index, name in enumerate(rng.sample(rotation, items_per_meal))
+                        ],
+                    }
+                    for meal in MEALS
+                ],
+            }
+        )
+    return {"site_name": hall, "days": days}
+
+
+class StubNutrisliceServer:
+    """Threaded local HTTP server answering the sites and weeks endpoints."""
+
+    def __init__(self, items_per_meal: int = 40):
+        self.locations = [{"id": index + 1, "name": hall} for index, hall in enumerate(HALLS)]
+        self.items_per_meal = items_per_meal
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests += 1
+                status, payload = stub.respond(self.path)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def respond(self, path: str) -> tuple[int, dict | list]:
+        if path == API_LOCATIONS_PATH:
+            return 200, self.locations
+        match = re.fullmatch(r"/api/menu/api/weeks/school/(\d+)/menu-type/\d+/([\d-]+)/", path)
+        if not match:
+            return 404, {}
+        location_id = int(match.group(1))
+        hall = next((loc["name"] for loc in self.locations if loc["id"] == location_id), None)
+        if hall is None:
+            return 404, {}
+        return 200, week_payload(location_id, hall, date.fromisoformat(match.group(2)), self.items_per_meal)
+
+    def __enter__(self) -> "StubNutrisliceServer":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -1,7 +1,18 @@
+from collections import Counter
+from datetime import date, timedelta
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import threading
+import time
+
 import pytest
 
 from app import create_app
 from app.models import db
+from app.services import menu_matcher
+from app.services.nutrislice_client import API_LOCATIONS_PATH, MenuItem, normalize_item_name
 
 
 @pytest.fixture
@@ -25,3 +36,140 @@ def app_instance():
 @pytest.fixture
 def client(app_instance):
     return app_instance.test_client()
+
+
+class FakeNutrisliceClient:
+    """Records every upstream call so tests can count fetches."""
+
+    locations = [{"id": 1, "name": "Gordon Avenue Market"}, {"id": 2, "name": "Four Lakes Market"}]
+    dinner = "Chicken Tikka Masala"
+
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+        self.stats = Counter()
+        self.stale_weeks = {}
+        self.unavailable_weeks = set()
+
+    def get_locations(self):
+        self.calls.append(("locations",))
+        return list(self.locations)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def get_menus_for_locations(self, location_ids, dates, meals=None):
+        self.calls.append(("menus", tuple(location_ids), tuple(dates)))
+        self.stats["requests"] += len(location_ids)
+        halls = {loc["id"]: loc["name"] for loc in self.locations}
+        return {
+            (location_id, target_date): [
+                MenuItem(self.dinner, normalize_item_name(self.dinner), "Dinner", target_date, halls[location_id])
+            ]
+            for location_id in location_ids
+            for target_date in dates
+        }
+
+
+@pytest.fixture
+def fake_nutrislice(monkeypatch):
+    """Replace the matcher's Nutrislice client; returns the list of clients built."""
+    clients = []
+
+    def build_client(*args, **kwargs):
+        clients.append(FakeNutrisliceClient())
+        return clients[-1]
+
+    monkeypatch.setattr(menu_matcher, "NutrisliceClient", build_client)
+    return clients
+
+
+class StubNutrislice:
+    """Local HTTP stand-in for the Nutrislice sites and weeks endpoints."""
+
+    def __init__(self, locations=None, delay=0.0):
+        self.locations = locations or [{"id": 1, "name": "Gordon Avenue Market"}, {"id": 2, "name": "Four Lakes Market"}]
+        self.delay = delay
+        self.failures = 0
+        self.down = False
+        self.overrides = {}
+        self.requests = []
+        self.not_modified = 0
+        self._lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def week_payload(self, location_id, week_start):
+        hall = next(loc["name"] for loc in self.locations if loc["id"] == location_id)
+        days = []
+        for offset in range(7):
+            day = week_start + timedelta(days=offset)
+            days.append(
+                {
+                    "date": day.isoformat(),
+                    "menu_items": [
+                        {"meal": "Lunch", "items": [{"name": f"Pizza {location_id} {day.isoformat()}"}]},
+                        {"meal": "Dinner", "items": [{"name": "Chicken Tikka Masala"}]},
+                    ],
+                }
+            )
+        return {"site_name": hall, "days": days}
+
+    def handle(self, handler):
+        with self._lock:
+            self.requests.append(handler.path)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            with self._lock:
+                if self.down or self.failures:
+                    self.failures = max(0, self.failures - 1)
+                    return 503, {}
+            for path_fragment, response in self.overrides.items():
+                if path_fragment in handler.path:
+                    return response
+            if handler.path == API_LOCATIONS_PATH:
+                return 200, self.locations
+            match = re.fullmatch(r"/api/menu/api/weeks/school/(\d+)/menu-type/\d+/([\d-]+)/", handler.path)
+            if match:
+                return 200, self.week_payload(int(match.group(1)), date.fromisoformat(match.group(2)))
+            return 404, {}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def stub_nutrislice():
+    stub = StubNutrislice()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            status, payload = stub.handle(self)
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                stub.not_modified += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stub.base_url = f"http://127.0.0.1:{server.server_port}"
+    yield stub
+    server.shutdown()
+    server.server_close()
@@ -1,4 +1,10 @@
-from app.models import User
+from datetime import date, timedelta
+import threading
+
+from app.models import Favorite, MenuMatch, User, db
+from app.services import menu_matcher
+from app.services.check_jobs import ManualCheckQueue
+from app.services.dashboard_cache import DashboardCache, DashboardData, FavoriteView
 
 
 def test_signup_and_login_flow(client, app_instance):
@@ -20,3 +26,167 @@ def test_signup_and_login_flow(client, app_instance):
         follow_redirects=True,
     )
     assert b"Dashboard" in login_response.data
+
+
+def test_manual_check_runs_in_background(client, app_instance, fake_nutrislice):
+    client.post("/signup", data={"email": "check@wisc.edu", "password": "pw"})
+    client.post("/login", data={"email": "check@wisc.edu", "password": "pw"})
+
+    response = client.post("/dashboard", data={"action": "manual_check"}, follow_redirects=True)
+    assert b"Menu check started" in response.data
+
+    with app_instance.app_context():
+        user = User.query.filter_by(email="check@wisc.edu").first()
+        job = app_instance.extensions["check_queue"].wait(user.id, timeout=5)
+        assert job.status == "done"
+        assert db.session.get(User, user.id).last_checked_at is not None
+
+    assert client.get("/dashboard/check-status").get_json()["status"] == "done"
+
+
+def test_manual_check_records_when_it_started(client, app_instance, monkeypatch):
+    import app as app_module
+
+    def add_favorite_during_check(user_id, **kwargs):
+        db.session.add(Favorite(user_id=user_id, item_name="Paneer", normalized_name="paneer"))
+        db.session.commit()
+        return []
+
+    monkeypatch.setattr(app_module, "run_menu_check_for_user", add_favorite_during_check)
+    client.post("/signup", data={"email": "during@wisc.edu", "password": "pw"})
+    client.post("/login", data={"email": "during@wisc.edu", "password": "pw"})
+    client.post("/dashboard", data={"action": "manual_check"})
+
+    with app_instance.app_context():
+        user_id = User.query.filter_by(email="during@wisc.edu").first().id
+        assert app_instance.extensions["check_queue"].wait(user_id, timeout=5).status == "done"
+        db.session.expire_all()
+        user = db.session.get(User, user_id)
+        (favorite,) = Favorite.query.filter_by(user_id=user.id, item_name="Paneer")
+        assert user.last_checked_at < favorite.created_at
+
+
+def test_manual_check_reports_failure(client, app_instance, fake_nutrislice, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise RuntimeError("Nutrislice is down")
+
+    monkeypatch.setattr(menu_matcher, "_fetch_menus_for_user", unavailable)
+    client.post("/signup", data={"email": "down@wisc.edu", "password": "pw"})
+    client.post("/login", data={"email": "down@wisc.edu", "password": "pw"})
+    client.post("/dashboard", data={"action": "manual_check"})
+
+    with app_instance.app_context():
+        user = User.query.filter_by(email="down@wisc.edu").first()
+        job = app_instance.extensions["check_queue"].wait(user.id, timeout=5)
+        assert job.status == "failed"
+        assert db.session.get(User, user.id).last_checked_at is None
+
+    assert b"could not complete" in client.get("/dashboard").data
+
+
+def test_manual_check_queue_coalesces_running_jobs(app_instance):
+    release = threading.Event()
+    queue = ManualCheckQueue(app_instance, lambda user_id: release.wait(5) and [], max_workers=1)
+
+    first, started = queue.submit(1)
+    duplicate, duplicate_started = queue.submit(1)
+    release.set()
+    queue.wait(1, timeout=5)
+
+    assert started and not duplicate_started
+    assert duplicate is first
+    assert queue.status(1).status == "done"
+
+
+def test_dashboard_lists_upcoming_matches_from_cache(client, app_instance):
+    client.post("/signup", data={"email": "dash@wisc.edu", "password": "pw"})
+    client.post("/login", data={"email": "dash@wisc.edu", "password": "pw"})
+    today = date.today()
+
+    def add_match(item_name, menu_date):
+        with app_instance.app_context():
+            user = User.query.filter_by(email="dash@wisc.edu").first()
+            db.session.add(
+                MenuMatch(
+                    user_id=user.id,
+                    favorite_item_name="Tikka",
+                    menu_item_name=item_name,
+                    dining_hall="Four Lakes Market",
+                    meal="Dinner",
+                    menu_date=menu_date,
+                )
+            )
+            db.session.commit()
+
+    add_match("Yesterday's Tikka", today - timedelta(days=1))
+    add_match("Tomorrow's Tikka", today + timedelta(days=1))
+    page = client.get("/dashboard").data
+    assert b"Tomorrow&#39;s Tikka" in page
+    assert b"Yesterday&#39;s Tikka" not in page
+
+    add_match("Today's Tikka", today)
+    assert b"Today&#39;s Tikka" not in client.get("/dashboard").data
+
+    client.post("/dashboard", data={"action": "add_favorite", "item_name": "Paneer"})
+    page = client.get("/dashboard").data
+    assert b"Today&#39;s Tikka" in page and b"Paneer" in page
+
+
+def test_dashboard_changes_reach_every_worker(tmp_path):
+    from app import create_app
+
+    config = {"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'web.db'}", "SECRET_KEY": "s"}
+    worker_a, worker_b = create_app(config).test_client(), create_app(config).test_client()
+    worker_a.post("/signup", data={"email": "workers@wisc.edu", "password": "pw"})
+    for worker in (worker_a, worker_b):
+        worker.post("/login", data={"email": "workers@wisc.edu", "password": "pw"})
+
+    assert b"Paneer" not in worker_b.get("/dashboard").data
+    worker_a.post("/dashboard", data={"action": "add_favorite", "item_name": "Paneer"})
+    assert b"Paneer" in worker_b.get("/dashboard").data
+
+
+def test_dashboard_cache_never_serves_data_loaded_during_an_invalidation():
+    cache = DashboardCache(ttl_seconds=60)
+    today = date.today()
+    stale = DashboardData(favorites=(FavoriteView(1, "Tikka"),), upcoming_matches=())
+    fresh = DashboardData(favorites=(), upcoming_matches=())
+
+    assert cache.get(1, 0, today, lambda user_id, day: stale) is stale
+    assert cache.get(1, 1, today, lambda user_id, day: fresh) is fresh
+    assert cache.get(1, 0, today, lambda user_id, day: stale) is stale
+    assert cache.get(1, 1, today, lambda user_id, day: stale) is fresh
+
+
+def test_menus_api_serves_warmed_menus_without_upstream_calls(client, app_instance, stub_nutrislice):
+    app_instance.config.update(NUTRISLICE_BASE_URL=stub_nutrislice.base_url, NUTRISLICE_BACKOFF_SECONDS=0)
+    assert client.get("/api/menus").status_code == 503
+
+    stub_nutrislice.down = True
+    result = app_instance.test_cli_runner().invoke(args=["warm_menus"])
+    assert result.exception is None and "'locations': 0" in result.output
+    stub_nutrislice.down = False
+    app_instance.extensions["nutrislice_breaker"].record_success()
+
+    result = app_instance.test_cli_runner().invoke(args=["warm_menus"])
+    assert "Menu warm-up complete" in result.output
+    fetched = len(stub_nutrislice.requests)
+
+    today = date.today().isoformat()
+    response = client.get(f"/api/menus?date={today}&hall=Four Lakes Market&meal=dinner")
+    assert response.status_code == 200
+    assert response.get_json()["menus"] == [
+        {"dining_hall": "Four Lakes Market", "meal": "Dinner", "items": ["Chicken Tikka Masala"]}
+    ]
+    assert response.headers["Cache-Control"] == "public, max-age=300"
+
+    revalidated = client.get(
+        f"/api/menus?date={today}&hall=Four Lakes Market&meal=dinner",
+        headers={"If-None-Match": response.headers["ETag"]},
+    )
+    assert revalidated.status_code == 304
+    assert client.get("/api/menus?date=tomorrow").status_code == 400
+    with app_instance.app_context():
+        app_instance.extensions["menu_autocomplete"].refresh()
+    assert client.get("/api/favorites/autocomplete?q=tikka").get_json() == {"suggestions": ["Chicken Tikka Masala"]}
+    assert len(stub_nutrislice.requests) == fetched
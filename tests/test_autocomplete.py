@@ -0,0 +1,67 @@
+from datetime import date, datetime, timedelta
+import json
+
+from app.models import MenuCacheEntry, db
+from app.services.autocomplete import PrefixIndex
+
+
+def test_prefix_index_suggests_by_word_prefix_and_evicts_oldest_names():
+    index = PrefixIndex(max_names=3)
+    index.add(
+        [
+            ("chicken tikka masala", "Chicken Tikka Masala", date(2026, 2, 3)),
+            ("tikka bowl", "Tikka Bowl", date(2026, 2, 3)),
+            ("mac cheese", "Mac & Cheese", date(2026, 2, 1)),
+        ]
+    )
+    assert index.suggest("Tik") == ["Tikka Bowl", "Chicken Tikka Masala"]
+    assert index.suggest("chicken t") == ["Chicken Tikka Masala"]
+
+    assert index.add([("cheese curds", "Cheese Curds", date(2026, 2, 4))]) == 1
+    assert len(index) == 3
+    assert index.suggest("chee") == ["Cheese Curds"]
+
+
+def test_prefix_index_lookups_respect_limit_on_large_indexes():
+    index = PrefixIndex(max_names=20000)
+    index.add((f"dish {number} special", f"Dish {number} Special", date(2026, 2, 1)) for number in range(20000))
+
+    assert len(index) == 20000
+    assert index.suggest("dish 19999") == ["Dish 19999 Special"]
+    assert len(index.suggest("dish 1", limit=5)) == 5
+    assert index.suggest("special", limit=3) == ["Dish 0 Special", "Dish 1 Special", "Dish 10 Special"]
+    assert index.suggest("   ") == [] and index.suggest("dish", limit=0) == []
+
+
+def _week(name):
+    return json.dumps({"days": [{"date": "2026-02-02", "menu_items": [{"meal": "Lunch", "items": [{"name": name}]}]}]})
+
+
+def test_menu_autocomplete_picks_up_late_commits_and_updated_weeks(app_instance):
+    autocomplete = app_instance.extensions["menu_autocomplete"]
+    now = datetime.utcnow()
+    with app_instance.app_context():
+        first = MenuCacheEntry(
+            resource="/weeks/1/", location_id=1, week_start=date(2026, 2, 1), payload=_week("Tacos"), fetched_at=now
+        )
+        db.session.add(first)
+        db.session.commit()
+        assert autocomplete.refresh() == 1
+
+        db.session.add(
+            MenuCacheEntry(
+                resource="/weeks/2/",
+                location_id=2,
+                week_start=date(2026, 2, 1),
+                payload=_week("Cheese Pizza"),
+                fetched_at=now - timedelta(seconds=30),
+            )
+        )
+        first.payload = _week("Tikka Bowl")
+        first.fetched_at = now + timedelta(seconds=1)
+        db.session.commit()
+        assert autocomplete.refresh() == 2
+        assert autocomplete.refresh() == 0
+
+    assert autocomplete.index.suggest("ch") == ["Cheese Pizza"]
+    assert autocomplete.index.suggest("tik") == ["Tikka Bowl"]
@@ -0,0 +1,16 @@
+from datetime import datetime
+
+from app.services.digest_schedule import DigestSchedule
+
+
+def test_digest_schedule_windows():
+    schedule = DigestSchedule(morning_hour=12, weekly_weekday=0)
+    wednesday = datetime(2026, 2, 4, 9, 30)
+
+    assert schedule.window_start("instant", wednesday) is None
+    assert schedule.window_start("once_per_day", wednesday) == datetime(2026, 2, 4)
+    assert schedule.window_start("every_morning", wednesday) == datetime(2026, 2, 3, 12)
+    assert schedule.window_start("weekly", wednesday) == datetime(2026, 2, 2, 12)
+    assert schedule.window_start("unknown", wednesday) == schedule.window_start("once_per_day", wednesday)
+    assert schedule.is_due("weekly", datetime(2026, 2, 2, 11), wednesday)
+    assert not schedule.is_due("weekly", datetime(2026, 2, 2, 13), wednesday)
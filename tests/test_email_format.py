@@ -1,15 +1,20 @@
-from app.services.email_service import build_match_email_content
+from datetime import date
+import smtplib
+
+from app.models import MenuMatch
+from app.services import email_service
+from app.services.email_service import DigestRenderer, build_match_email_content
 
 
 def test_build_match_email_content_structure():
     matches = [
-        {
-            "favorite_item_name": "Pizza",
-            "menu_item_name": "Cheese Pizza",
-            "dining_hall": "Gordon Avenue Market",
-            "meal": "Lunch",
-            "menu_date": "2026-02-01",
-        }
+        MenuMatch(
+            favorite_item_name="Pizza",
+            menu_item_name="Cheese Pizza",
+            dining_hall="Gordon Avenue Market",
+            meal="Lunch",
+            menu_date="2026-02-01",
+        )
     ]
 
     subject, html_body, text_body = build_match_email_content(
@@ -20,3 +25,100 @@ def test_build_match_email_content_structure():
     assert "<table" in html_body
     assert "Cheese Pizza" in html_body
     assert "Dashboard" in text_body
+
+
+class DebugSMTP:
+    """In-memory stand-in for ``smtplib.SMTP`` that can drop connections on demand."""
+
+    connections: list["DebugSMTP"] = []
+    drops = 0
+
+    def __init__(self, host, port):
+        self.sent = []
+        self.logins = 0
+        self.closed = False
+        DebugSMTP.connections.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        self.logins += 1
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        if DebugSMTP.drops:
+            DebugSMTP.drops -= 1
+            raise smtplib.SMTPServerDisconnected("connection dropped")
+        self.sent.extend(to_addrs)
+
+    def quit(self):
+        self.closed = True
+
+    close = quit
+
+
+def test_send_batch_reuses_connections_and_reconnects(monkeypatch):
+    monkeypatch.setattr(email_service.smtplib, "SMTP", DebugSMTP)
+    monkeypatch.setattr(DebugSMTP, "connections", [])
+    monkeypatch.setattr(DebugSMTP, "drops", 1)
+    client = email_service.EmailClient("localhost", 25, "user", "secret", "alerts@example.com", messages_per_connection=2)
+    emails = [email_service.OutgoingEmail(f"u{i}@wisc.edu", "s", "<p>h</p>", "t") for i in range(5)]
+
+    result = client.send_batch(emails)
+
+    assert result.sent == 5 and result.failed == 0
+    assert result.connections == len(DebugSMTP.connections) == 4
+    assert [address for conn in DebugSMTP.connections for address in conn.sent] == [e.to_email for e in emails]
+    assert all(conn.closed and conn.logins == 1 for conn in DebugSMTP.connections)
+
+
+def test_digest_groups_by_day_hall_and_meal_and_escapes_values():
+    matches = [
+        MenuMatch(
+            favorite_item_name="Pizza",
+            menu_item_name="Pizza <script>alert(1)</script>",
+            dining_hall="Rheta's Market",
+            meal="Dinner",
+            menu_date=date(2026, 2, 1),
+        ),
+        MenuMatch(
+            favorite_item_name="Curds",
+            menu_item_name="Cheese Curds",
+            dining_hall="Rheta's Market",
+            meal="Dinner",
+            menu_date=date(2026, 2, 1),
+        ),
+        MenuMatch(
+            favorite_item_name="Curds",
+            menu_item_name="Cheese Curds",
+            dining_hall="Four Lakes Market",
+            meal="Lunch",
+            menu_date=date(2026, 2, 2),
+        ),
+    ]
+    renderer = DigestRenderer()
+
+    _, html_body, text_body = build_match_email_content("a@wisc.edu", matches, "http://x", renderer)
+    build_match_email_content("b@wisc.edu", matches[1:], "http://x", renderer)
+
+    assert "<script>" not in html_body and "&lt;script&gt;" in html_body
+    assert html_body.count("<th colspan") == 2
+    assert text_body.index("Sunday, Feb 01, 2026 | Rheta's Market | Dinner") < text_body.index("- Curds => Cheese Curds")
+    assert (renderer.rendered, renderer.reused) == (3, 1)
+
+
+def test_digest_renderer_evicts_least_recently_used_sections():
+    def match(day):
+        return MenuMatch(
+            favorite_item_name="Curds",
+            menu_item_name="Cheese Curds",
+            dining_hall="Four Lakes Market",
+            meal="Lunch",
+            menu_date=date(2026, 2, day),
+        )
+
+    renderer = DigestRenderer(max_sections=2)
+    for day in (1, 2, 1, 3, 1, 2):
+        renderer.render("a@wisc.edu", [match(day)], "http://x")
+
+    assert (renderer.rendered, renderer.reused) == (4, 2)
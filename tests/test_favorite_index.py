@@ -0,0 +1,10 @@
+from app.services.favorite_index import favorite_lookup_key, menu_lookup_keys
+
+
+def test_lookup_keys_find_every_favorite_a_menu_name_contains():
+    menu_name = "spicy chicken tikka masala"
+    keys = menu_lookup_keys([menu_name])
+
+    for favorite in ("tikka", "ken tik", "masala", "a", "sp", "spicy chicken tikka masala"):
+        assert favorite_lookup_key(favorite) in keys
+    assert favorite_lookup_key("pizza") not in keys
@@ -1,5 +1,15 @@
-from app.models import Favorite, User
-from app.services.menu_matcher import find_matches_for_user
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, text
+
+from app.models import Favorite, MenuMatch, User, db
+from app.services.email_service import BatchSendResult
+from app.services import menu_matcher
+from app.services.favorite_index import FavoriteMatcher
+from app.services.fuzzy_index import FuzzySettings, MenuNameIndex
+from app.services.menu_matcher import find_matches_for_user, run_menu_check_for_all_users
+from app.services.menu_snapshot import MenuSnapshot
+from app.services.nutrislice_client import MenuItem, normalize_item_name
 
 
 def test_find_matches_case_insensitive_spacing(app_instance):
@@ -7,22 +17,387 @@ def test_find_matches_case_insensitive_spacing(app_instance):
         user = User(email="user@example.com", password_hash="x")
         favorite = Favorite(user_id=1, item_name="Chicken Tikka", normalized_name="chicken tikka")
         menus = [
-            {
-                "name": "CHICKEN   TIKKA masala",
-                "dining_hall": "Gordon Avenue Market",
-                "meal": "Dinner",
-                "date": "2026-01-01",
-            },
-            {
-                "name": "Vegetable Curry",
-                "dining_hall": "Four Lakes Market",
-                "meal": "Lunch",
-                "date": "2026-01-01",
-            },
+            MenuItem(
+                name="CHICKEN   TIKKA masala",
+                normalized_name=normalize_item_name("CHICKEN   TIKKA masala"),
+                meal="Dinner",
+                date=date(2026, 1, 1),
+                dining_hall="Gordon Avenue Market",
+            ),
+            MenuItem(
+                name="Vegetable Curry",
+                normalized_name=normalize_item_name("Vegetable Curry"),
+                meal="Lunch",
+                date=date(2026, 1, 1),
+                dining_hall="Four Lakes Market",
+            ),
         ]
 
         matches = find_matches_for_user(user, menus, [favorite])
 
     assert len(matches) == 1
-    assert matches[0]["favorite_item_name"] == "Chicken Tikka"
-    assert matches[0]["dining_hall"] == "Gordon Avenue Market"
+    assert matches[0].favorite_item_name == "Chicken Tikka"
+    assert matches[0].dining_hall == "Gordon Avenue Market"
+
+
+def test_run_menu_check_for_all_users_shares_snapshot(app_instance, fake_nutrislice):
+    with app_instance.app_context():
+        for email in ("a@wisc.edu", "b@wisc.edu", "c@wisc.edu"):
+            user = User(email=email, password_hash="x")
+            user.set_dining_halls(["Gordon Avenue Market"])
+            user.set_meals(["Dinner"])
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Favorite(user_id=user.id, item_name="Chicken Tikka", normalized_name="chicken tikka"))
+        db.session.commit()
+
+        summary = run_menu_check_for_all_users(send_email=False)
+
+    assert len(fake_nutrislice) == 1
+    assert summary["users_checked"] == 3
+    assert summary["users_with_matches"] == 3
+    assert summary["menu_fetches"] == 1
+    assert summary["menu_snapshot_hits"] == 3
+
+
+def test_favorite_matcher_agrees_with_substring_rule():
+    favorites = [
+        Favorite(user_id=1, item_name="Cheese", normalized_name="cheese"),
+        Favorite(user_id=1, item_name="Mac & Cheese", normalized_name="mac  cheese"),
+        Favorite(user_id=2, item_name="Mac Cheese", normalized_name="mac cheese"),
+        Favorite(user_id=2, item_name="ese", normalized_name="ese"),
+        Favorite(user_id=3, item_name="Burger", normalized_name="burger"),
+        Favorite(user_id=3, item_name="", normalized_name=""),
+    ]
+    matcher = FavoriteMatcher(favorites)
+
+    for menu_name in ["baked mac cheese", "cheeseburger", "vegetable curry", "ese"]:
+        expected = {
+            (fav.user_id, fav.item_name)
+            for fav in favorites
+            if fav.normalized_name and fav.normalized_name in menu_name
+        }
+        assert set(matcher.match(menu_name)) == expected
+
+
+def test_scan_only_loads_users_subscribed_to_served_menus(app_instance, fake_nutrislice):
+    with app_instance.app_context():
+        lunch_only = User(email="lunch@wisc.edu", password_hash="x")
+        lunch_only.set_meals(["Lunch"])
+        no_favorites = User(email="none@wisc.edu", password_hash="x")
+        any_meal = User(email="any@wisc.edu", password_hash="x")
+        db.session.add_all([lunch_only, no_favorites, any_meal])
+        db.session.flush()
+        for user in (lunch_only, any_meal):
+            db.session.add(Favorite(user_id=user.id, item_name="Chicken Tikka", normalized_name="chicken tikka"))
+        db.session.commit()
+
+        summary = run_menu_check_for_all_users(send_email=False)
+
+    assert summary["users_checked"] == 1
+    assert summary["total_matches"] == 2
+
+
+def test_scan_query_count_does_not_grow_with_users(app_instance, fake_nutrislice):
+    def scan_with_users(count):
+        with app_instance.app_context():
+            db.drop_all()
+            db.create_all()
+            for index in range(count):
+                user = User(email=f"u{index}@wisc.edu", password_hash="x")
+                user.favorites.append(Favorite(item_name="Tikka", normalized_name="tikka"))
+                db.session.add(user)
+            db.session.commit()
+            db.session.expunge_all()
+
+            statements = []
+
+            def listener(conn, cursor, statement, *args):
+                statements.append(statement)
+
+            event.listen(db.engine, "before_cursor_execute", listener)
+            try:
+                summary = run_menu_check_for_all_users(send_email=False)
+            finally:
+                event.remove(db.engine, "before_cursor_execute", listener)
+        assert summary["users_with_matches"] == count
+        return len(statements)
+
+    assert scan_with_users(3) == scan_with_users(30)
+
+
+class RecordingEmailClient:
+    def __init__(self):
+        self.batches = []
+
+    def send_batch(self, emails):
+        emails = list(emails)
+        self.batches.append(emails)
+        return BatchSendResult(sent=len(emails), connections=1)
+
+
+def test_repeat_scans_store_matches_once_and_alert_once(app_instance, fake_nutrislice):
+    email_client = RecordingEmailClient()
+    app_instance.extensions["email_client"] = email_client
+    with app_instance.app_context():
+        user = User(email="repeat@wisc.edu", password_hash="x")
+        user.favorites.append(Favorite(item_name="Chicken Tikka", normalized_name="chicken tikka"))
+        db.session.add(user)
+        db.session.commit()
+
+        first = run_menu_check_for_all_users(send_email=True)
+        second = run_menu_check_for_all_users(send_email=True)
+
+        assert MenuMatch.query.count() == 2
+        assert MenuMatch.query.filter(MenuMatch.notified_at.is_(None)).count() == 0
+
+    assert first["new_matches"] == 2 and first["emails_sent"] == 1
+    assert second["total_matches"] == 2 and second["new_matches"] == 0 and second["emails_sent"] == 0
+    assert len(email_client.batches) == 1
+
+
+def test_incremental_scan_skips_unchanged_menus_and_favorites(app_instance, fake_nutrislice):
+    with app_instance.app_context():
+        user = User(email="inc@wisc.edu", password_hash="x")
+        user.favorites.append(Favorite(item_name="Chicken Tikka", normalized_name="chicken tikka"))
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+        first = run_menu_check_for_all_users(send_email=False, incremental=True)
+        quiet = run_menu_check_for_all_users(send_email=False, incremental=True)
+        db.session.add(Favorite(user_id=user_id, item_name="Masala", normalized_name="masala"))
+        db.session.commit()
+        after_new_favorite = run_menu_check_for_all_users(send_email=False, incremental=True)
+        stored = MenuMatch.query.count()
+
+    assert first["menus_changed"] == 2 and first["new_matches"] == 2
+    assert quiet["menus_changed"] == 0 and quiet["menus_unchanged"] == 2
+    assert quiet["users_checked"] == 0 and quiet["users_skipped"] == 1
+    assert after_new_favorite["users_checked"] == 1
+    assert after_new_favorite["total_matches"] == 2
+    assert stored == 4
+
+
+def test_incremental_shards_each_see_menu_changes(app_instance, fake_nutrislice, monkeypatch):
+    with app_instance.app_context():
+        for index in range(4):
+            user = User(email=f"inc-shard{index}@wisc.edu", password_hash="x")
+            user.favorites.append(Favorite(item_name="Tikka", normalized_name="tikka"))
+            db.session.add(user)
+        db.session.commit()
+
+        for index in range(2):
+            run_menu_check_for_all_users(send_email=False, incremental=True, shard=(index, 2))
+        monkeypatch.setattr(type(fake_nutrislice[0]), "dinner", "Paneer Tikka Masala")
+        shards = [run_menu_check_for_all_users(send_email=False, incremental=True, shard=(index, 2)) for index in range(2)]
+        unchanged = run_menu_check_for_all_users(send_email=False, incremental=True, shard=(1, 2))
+
+    assert [summary["menus_changed"] for summary in shards] == [2, 2]
+    assert [summary["new_matches"] for summary in shards] == [4, 4]
+    assert unchanged["menus_changed"] == 0
+
+
+def test_find_matches_uses_carried_normalized_names(app_instance, monkeypatch):
+    from app.services import nutrislice_client
+
+    def fail(name):
+        raise AssertionError(f"{name!r} was normalized again")
+
+    monkeypatch.setattr(nutrislice_client, "normalize_item_name", fail)
+    favorite = Favorite(user_id=1, item_name="Curds", normalized_name="curds")
+    menus = [MenuItem("Squeaky Bites", "fried cheese curds", "Lunch", date(2026, 1, 1), "Four Lakes Market")]
+
+    with app_instance.app_context():
+        matches = find_matches_for_user(User(email="u@wisc.edu"), menus, [favorite])
+
+    assert [match.menu_item_name for match in matches] == ["Squeaky Bites"]
+
+
+def test_matches_share_menu_items_without_copying(app_instance):
+    item = MenuItem("Fried Cheese CURDS!", "fried cheese curds", "Lunch", date(2026, 1, 1), "Four Lakes Market")
+    favorite = Favorite(user_id=1, item_name="Curds", normalized_name="curds")
+
+    with app_instance.app_context():
+        (match,) = find_matches_for_user(User(email="u@wisc.edu"), [item], [favorite])
+
+    assert match.item is item
+    assert (match.menu_item_name, match.menu_date) == ("Fried Cheese CURDS!", date(2026, 1, 1))
+    assert not hasattr(item, "__dict__") and not hasattr(match, "__dict__")
+
+
+def test_sharded_and_multi_process_scans_cover_every_user_once(tmp_path, fake_nutrislice):
+    from app import create_app
+
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'scan.db'}",
+            "MENU_LOOKAHEAD_DAYS": 1,
+            "SCAN_CHUNK_SIZE": 2,
+        }
+    )
+    with app.app_context():
+        for index in range(7):
+            user = User(email=f"shard{index}@wisc.edu", password_hash="x")
+            user.favorites.append(Favorite(item_name="Tikka", normalized_name="tikka"))
+            db.session.add(user)
+        db.session.commit()
+
+        shards = [run_menu_check_for_all_users(send_email=False, shard=(index, 3)) for index in range(3)]
+        assert [summary["users_checked"] for summary in shards] == [2, 3, 2]
+        assert all(summary["users_skipped"] == 0 for summary in shards)
+
+        MenuMatch.query.delete()
+        db.session.commit()
+        summary = run_menu_check_for_all_users(send_email=False, workers=2)
+
+        assert summary["workers"] == 2
+        assert summary["users_checked"] == 7 and summary["new_matches"] == 14
+        assert summary["menu_snapshot_hits"] == 14
+        assert MenuMatch.query.count() == 14
+        assert User.query.filter(User.last_checked_at.is_(None)).count() == 0
+        db.engine.dispose()
+
+
+def test_menu_name_index_tolerates_abbreviations_and_typos():
+    names = ["Macaroni & Cheese", "Chicken Tikka Masala", "Chickpea Curry", "Beef Tacos"]
+    index = MenuNameIndex([normalize_item_name(name) for name in names], FuzzySettings())
+
+    assert index.lookup("mac n cheese") == ["macaroni  cheese"]
+    assert index.lookup("chiken tikka") == ["chicken tikka masala"]
+    assert index.lookup("beef taco") == ["beef tacos"]
+    assert index.lookup("chicken") == ["chicken tikka masala"]
+    assert index.lookup("pork tacos") == []
+
+
+def test_fuzzy_matching_is_opt_in(app_instance, fake_nutrislice):
+    with app_instance.app_context():
+        user = User(email="fuzzy@wisc.edu", password_hash="x")
+        user.favorites.append(Favorite(item_name="Chiken Tikka", normalized_name="chiken tikka"))
+        db.session.add(user)
+        db.session.commit()
+
+        exact = run_menu_check_for_all_users(send_email=False)
+        app_instance.config["FUZZY_MATCHING"] = True
+        fuzzy = run_menu_check_for_all_users(send_email=False)
+
+        assert exact["total_matches"] == 0
+        assert fuzzy["total_matches"] == 2
+        assert {row.menu_item_name for row in MenuMatch.query} == {"Chicken Tikka Masala"}
+
+
+def test_scans_hold_matches_until_each_users_digest_is_due(app_instance, fake_nutrislice):
+    email_client = RecordingEmailClient()
+    app_instance.extensions["email_client"] = email_client
+    with app_instance.app_context():
+        for frequency in ("instant", "weekly"):
+            user = User(email=f"{frequency}@wisc.edu", password_hash="x", notification_frequency=frequency)
+            user.favorites.append(Favorite(item_name="Tikka", normalized_name="tikka"))
+            db.session.add(user)
+        db.session.commit()
+
+        first = run_menu_check_for_all_users(send_email=True)
+        for user in User.query:
+            user.favorites.append(Favorite(item_name="Masala", normalized_name="masala"))
+        db.session.commit()
+        second = run_menu_check_for_all_users(send_email=True)
+        held = MenuMatch.query.filter(MenuMatch.notified_at.is_(None)).count()
+
+        weekly = User.query.filter_by(email="weekly@wisc.edu").one()
+        weekly.last_notified_at -= timedelta(days=8)
+        db.session.commit()
+        third = run_menu_check_for_all_users(send_email=True)
+
+    assert first["digest_users_due"] == 2 and first["emails_sent"] == 2
+    assert second["new_matches"] == 4 and second["digest_users_due"] == 1
+    assert [email.to_email for email in email_client.batches[1]] == ["instant@wisc.edu"]
+    assert held == 2
+    assert third["new_matches"] == 0 and [email.to_email for email in email_client.batches[2]] == ["weekly@wisc.edu"]
+
+
+def test_due_digests_go_out_when_menus_cannot_be_fetched(app_instance, fake_nutrislice, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise RuntimeError("Nutrislice is down and nothing is cached")
+
+    email_client = RecordingEmailClient()
+    app_instance.extensions["email_client"] = email_client
+    with app_instance.app_context():
+        user = User(email="pending@wisc.edu", password_hash="x", notification_frequency="instant")
+        user.favorites.append(Favorite(item_name="Tikka", normalized_name="tikka"))
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(
+            MenuMatch(
+                user_id=user.id,
+                favorite_item_name="Tikka",
+                menu_item_name="Chicken Tikka Masala",
+                dining_hall="Four Lakes Market",
+                meal="Dinner",
+                menu_date=date.today(),
+            )
+        )
+        db.session.commit()
+
+        monkeypatch.setattr(MenuSnapshot, "build", unavailable)
+        summary = run_menu_check_for_all_users(send_email=True)
+        pending = MenuMatch.query.filter(MenuMatch.notified_at.is_(None)).count()
+
+    assert summary["users_checked"] == 0
+    assert summary["digest_users_due"] == 1 and summary["emails_sent"] == 1
+    assert [email.to_email for email in email_client.batches[0]] == ["pending@wisc.edu"]
+    assert pending == 0
+
+
+def test_incremental_scan_loads_only_users_interested_in_changed_menus(app_instance):
+    today = date.today()
+    snapshot = MenuSnapshot(
+        dates=[today],
+        locations=[{"id": 1, "name": "Gordon Avenue Market"}, {"id": 2, "name": "Four Lakes Market"}],
+        menus={
+            (1, today): [
+                MenuItem("Chicken Tikka Masala", "chicken tikka masala", "Dinner", today, "Gordon Avenue Market")
+            ],
+            (2, today): [MenuItem("Pepperoni Pizza", "pepperoni pizza", "Lunch", today, "Four Lakes Market")],
+        },
+    )
+    with app_instance.app_context():
+        for email, favorite, halls in (
+            ("tikka@wisc.edu", "Tikka", []),
+            ("pizza@wisc.edu", "Pizza", []),
+            ("elsewhere@wisc.edu", "Tikka", ["Four Lakes Market"]),
+        ):
+            user = User(email=email, password_hash="x", last_checked_at=datetime.utcnow() + timedelta(minutes=1))
+            user.set_dining_halls(halls)
+            user.favorites.append(Favorite(item_name=favorite, normalized_name=normalize_item_name(favorite)))
+            db.session.add(user)
+        db.session.commit()
+
+        chunks = list(menu_matcher._iter_user_chunks(snapshot, 10, changed={(1, today)}))
+
+    assert [[user.email for user in chunk] for chunk in chunks] == [["tikka@wisc.edu"]]
+
+
+def test_incremental_candidates_come_from_index_lookups(app_instance, fake_nutrislice):
+    today = date.today()
+    snapshot = MenuSnapshot(
+        dates=[today],
+        locations=[{"id": 1, "name": "Gordon Avenue Market"}],
+        menus={(1, today): [MenuItem("Chicken Tikka", "chicken tikka", "Dinner", today, "Gordon Avenue Market")]},
+    )
+    with app_instance.app_context():
+        user = User(email="watermark@wisc.edu", password_hash="x")
+        user.favorites.append(Favorite(item_name="Pizza", normalized_name="pizza"))
+        db.session.add(user)
+        db.session.commit()
+        first = run_menu_check_for_all_users(send_email=False, incremental=True)
+        since = menu_matcher._scan_watermark(None)
+
+        statement = menu_matcher._candidate_user_ids(snapshot, {(1, today)}, since=since)
+        sql = str(statement.compile(db.engine, compile_kwargs={"literal_binds": True}))
+        plan = [row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+        candidates = db.session.scalars(statement).all()
+
+    assert first["users_checked"] == 1 and since is not None
+    assert candidates == []
+    assert not [step for step in plan if step.startswith(("SCAN user", "SCAN favorite"))]
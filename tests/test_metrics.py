@@ -0,0 +1,50 @@
+import json
+
+from app.models import Favorite, User, db
+from app.services.menu_matcher import run_menu_check_for_all_users
+from app.services.metrics import METRICS, MetricsRegistry
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.describe("demo_seconds", "Demo latency.")
+    registry.inc("demo_total", status=200)
+    registry.inc("demo_total", 2, status=200)
+    registry.observe("demo_seconds", 0.05, stage="fetch")
+    registry.observe("demo_seconds", 5.0, stage="fetch")
+
+    text = registry.render_prometheus()
+
+    assert 'demo_total{status="200"} 3' in text
+    assert "# HELP demo_seconds Demo latency." in text
+    assert 'demo_seconds_bucket{stage="fetch",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="1"} 1' in text
+    assert 'demo_seconds_bucket{stage="fetch",le="+Inf"} 2' in text
+    assert 'demo_seconds_count{stage="fetch"} 2' in text
+
+
+def test_scan_records_stage_timings_and_metrics_route(client, app_instance, fake_nutrislice, tmp_path):
+    METRICS.reset()
+    with app_instance.app_context():
+        user = User(email="m@wisc.edu", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Favorite(user_id=user.id, item_name="Tikka", normalized_name="tikka"))
+        db.session.commit()
+
+        summary = run_menu_check_for_all_users(send_email=False)
+
+    assert {"fetch", "diff", "load_users", "match", "store", "commit"} <= set(summary["stage_seconds"])
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'menu_check_stage_seconds_count{stage="match"} 1' in response.text
+    assert 'menu_check_runs_total{kind="full"} 1' in response.text
+
+    report = tmp_path / "report.json"
+    result = app_instance.test_cli_runner().invoke(args=["run_menu_check", "--report", str(report)])
+    assert result.exit_code == 0
+    data = json.loads(report.read_text())
+    assert data["summary"]["users_checked"] == 1
+    assert "menu_check_stage_seconds" in data["metrics"]["histograms"]
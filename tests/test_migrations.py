@@ -0,0 +1,73 @@
+from sqlalchemy import inspect, text
+
+from app.migrations import run_migrations
+from app.models import User, db
+from app.services.favorite_index import favorite_lookup_key
+
+
+def test_migrate_legacy_preference_columns(app_instance):
+    with app_instance.app_context():
+        db.session.execute(text('ALTER TABLE "user" ADD COLUMN dining_halls TEXT'))
+        db.session.execute(text('ALTER TABLE "user" ADD COLUMN meals TEXT'))
+        db.session.execute(
+            text(
+                'INSERT INTO "user" (email, password_hash, dining_halls, meals) '
+                "VALUES ('legacy@wisc.edu', 'x', 'Four Lakes Market,Rheta''s Market', 'Lunch,Dinner')"
+            )
+        )
+        db.session.commit()
+
+        run_migrations()
+        run_migrations()
+
+        user = User.query.filter_by(email="legacy@wisc.edu").first()
+        assert user.dining_halls_list() == ["Four Lakes Market", "Rheta's Market"]
+        assert user.meals_list() == ["Lunch", "Dinner"]
+
+
+def test_migrations_add_dashboard_indexes(app_instance):
+    with app_instance.app_context():
+        db.session.execute(text("DROP INDEX ix_favorite_user_created"))
+        db.session.execute(text("DROP INDEX ix_menu_match_user_date"))
+        db.session.execute(text("DROP INDEX ix_favorite_created"))
+        db.session.execute(text("DROP INDEX ix_user_preferences_updated"))
+        db.session.commit()
+
+        run_migrations()
+
+        favorite_indexes = {index["name"] for index in inspect(db.engine).get_indexes("favorite")}
+        assert {"ix_favorite_user_created", "ix_favorite_created"} <= favorite_indexes
+        assert "ix_menu_match_user_date" in {index["name"] for index in inspect(db.engine).get_indexes("menu_match")}
+        assert "ix_user_preferences_updated" in {index["name"] for index in inspect(db.engine).get_indexes("user")}
+
+
+def test_migrations_backfill_favorite_lookup_keys(app_instance):
+    with app_instance.app_context():
+        db.session.execute(text("INSERT INTO \"user\" (email, password_hash) VALUES ('keys@wisc.edu', 'x')"))
+        db.session.execute(
+            text("INSERT INTO favorite (user_id, item_name, normalized_name, lookup_key) VALUES (1, 'Tikka', 'tikka', '')")
+        )
+        db.session.execute(text("DROP INDEX ix_favorite_lookup_key"))
+        db.session.execute(text("ALTER TABLE favorite DROP COLUMN lookup_key"))
+        db.session.commit()
+
+        run_migrations()
+
+        assert db.session.execute(text("SELECT lookup_key FROM favorite")).scalar() == favorite_lookup_key("tikka")
+
+
+def test_migrations_key_menu_versions_by_shard(app_instance):
+    with app_instance.app_context():
+        db.session.execute(text("DROP TABLE menu_version"))
+        db.session.execute(
+            text(
+                "CREATE TABLE menu_version (location_id INTEGER, menu_date DATE, content_hash VARCHAR(64), "
+                "changed_at TIMESTAMP, PRIMARY KEY (location_id, menu_date))"
+            )
+        )
+        db.session.commit()
+
+        run_migrations()
+        run_migrations()
+
+        assert "shard" in {column["name"] for column in inspect(db.engine).get_columns("menu_version")}
@@ -0,0 +1,161 @@
+from datetime import date
+
+from app.services.menu_cache import MenuCache
+from app.services.nutrislice_client import (
+    CircuitBreaker,
+    NutrisliceClient,
+    iter_week_items,
+    parse_week_payload,
+    week_start_for,
+    week_starts_for,
+)
+
+
+def test_parse_week_payload_dates_items_by_day():
+    payload = {
+        "site_name": "Rheta's Market",
+        "days": [
+            {"date": "2026-02-01", "menu_items": [{"meal": "Lunch", "items": [{"name": "Cheese Pizza"}]}]},
+            {"date": "2026-02-02", "menu_items": [{"meal": "Dinner", "items": [{"name": "Tacos"}, {"name": ""}]}]},
+        ],
+    }
+
+    items = parse_week_payload(payload, 7, date(2026, 2, 1))
+
+    assert [(item.name, item.date) for item in items] == [
+        ("Cheese Pizza", date(2026, 2, 1)),
+        ("Tacos", date(2026, 2, 2)),
+    ]
+    assert items[1].dining_hall == "Rheta's Market"
+
+
+def test_iter_week_items_skips_unwanted_days_and_meals():
+    payload = {
+        "days": [
+            {"date": "2026-02-01", "menu_items": [{"meal": "Lunch", "items": [{"name": "Cheese Pizza"}]}]},
+            {
+                "date": "2026-02-02",
+                "menu_items": [
+                    {"meal": "Lunch", "items": [{"name": "Soup"}]},
+                    {"meal": "Dinner", "items": [{"name": "Tacos"}]},
+                ],
+            },
+        ],
+    }
+
+    items = iter_week_items(payload, 7, date(2026, 2, 1), dates={date(2026, 2, 2)}, meals={"dinner"})
+
+    assert [(item.name, item.dining_hall) for item in items] == [("Tacos", "Location 7")]
+
+
+def test_week_starts_for_lookahead_window():
+    # 2026-02-06 is a Friday; the window crosses into the next Sunday-based week.
+    dates = [date(2026, 2, 6), date(2026, 2, 7), date(2026, 2, 8)]
+
+    assert week_start_for(date(2026, 2, 1)) == date(2026, 2, 1)
+    assert week_starts_for(dates) == [date(2026, 2, 1), date(2026, 2, 8)]
+
+
+def test_get_menus_for_locations_fetches_each_week_once_concurrently(stub_nutrislice):
+    stub_nutrislice.delay = 0.2
+    dates = [date(2026, 2, 6), date(2026, 2, 7), date(2026, 2, 8)]
+
+    with NutrisliceClient(base_url=stub_nutrislice.base_url, max_workers=4) as client:
+        menus = client.get_menus_for_locations([1, 2], dates)
+
+    assert len(stub_nutrislice.requests) == 4
+    assert stub_nutrislice.max_active > 1
+    assert [item.name for item in menus[(2, date(2026, 2, 8))] if item.meal == "Lunch"] == ["Pizza 2 2026-02-08"]
+
+
+def test_menu_cache_serves_fresh_weeks_and_revalidates_stale_ones(app_instance, stub_nutrislice):
+    keys = [(1, date(2026, 2, 1)), (2, date(2026, 2, 1))]
+
+    with app_instance.app_context():
+        with NutrisliceClient(base_url=stub_nutrislice.base_url, cache=MenuCache(3600)) as client:
+            first = client.fetch_weeks(keys)
+            second = client.fetch_weeks(keys)
+        assert len(stub_nutrislice.requests) == 2
+        assert client.stats["cache_hits"] == 2
+        assert [item.name for item in second[keys[0]]] == [item.name for item in first[keys[0]]]
+
+        with NutrisliceClient(base_url=stub_nutrislice.base_url, cache=MenuCache(0)) as client:
+            stale = client.fetch_weeks(keys)
+        assert stub_nutrislice.not_modified == 2
+        assert client.stats["cache_revalidated"] == 2
+        assert len(stale[keys[1]]) == len(first[keys[1]])
+
+
+def test_menu_cache_save_resolves_conflicting_writes_to_the_same_resource(app_instance):
+    resource = "/menu/api/weeks/school/1/menu-type/1/2026/02/01/"
+
+    with app_instance.app_context():
+        MenuCache(3600).save(
+            [{"resource": resource, "payload": {"days": []}}, {"resource": resource, "payload": {"days": [1]}}]
+        )
+        MenuCache(3600).save([{"resource": resource, "payload": {"days": [2]}, "etag": "v2"}])
+        cached = MenuCache(3600).lookup([resource])[resource]
+
+    assert cached.payload == {"days": [2]}
+    assert cached.etag == "v2"
+
+
+def test_transient_errors_are_retried(stub_nutrislice):
+    stub_nutrislice.failures = 2
+
+    with NutrisliceClient(base_url=stub_nutrislice.base_url, retries=2, backoff_seconds=0) as client:
+        menu = client.get_week_menu(1, date(2026, 2, 1))
+
+    assert len(stub_nutrislice.requests) == 3
+    assert len(menu) == 14
+
+
+def test_outage_opens_breaker_and_serves_last_known_good_weeks(app_instance, stub_nutrislice):
+    keys = [(1, date(2026, 2, 1)), (2, date(2026, 2, 1))]
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60)
+
+    with app_instance.app_context():
+        with NutrisliceClient(base_url=stub_nutrislice.base_url, cache=MenuCache(3600)) as client:
+            first = client.fetch_weeks(keys[:1])
+
+        stub_nutrislice.down = True
+        options = {"cache": MenuCache(0), "retries": 1, "backoff_seconds": 0, "breaker": breaker, "max_workers": 1}
+        with NutrisliceClient(base_url=stub_nutrislice.base_url, **options) as client:
+            weeks = client.fetch_weeks(keys)
+        assert breaker.state == CircuitBreaker.OPEN
+        assert len(stub_nutrislice.requests) == 3
+        assert [item.name for item in weeks[keys[0]]] == [item.name for item in first[keys[0]]]
+        assert list(client.stale_weeks) == [keys[0]]
+        assert client.unavailable_weeks == {keys[1]}
+        assert keys[1] not in weeks
+
+        with NutrisliceClient(base_url=stub_nutrislice.base_url, **options) as client:
+            client.fetch_weeks(keys)
+        assert len(stub_nutrislice.requests) == 3
+        assert list(client.stale_weeks) == [keys[0]]
+
+
+def test_error_statuses_and_bad_json_fail_only_their_own_week(app_instance, stub_nutrislice):
+    keys = [(1, date(2026, 2, 1)), (2, date(2026, 2, 1)), (1, date(2026, 2, 8))]
+
+    with app_instance.app_context():
+        with NutrisliceClient(base_url=stub_nutrislice.base_url, cache=MenuCache(3600)) as client:
+            client.fetch_weeks(keys[:1])
+
+        stub_nutrislice.overrides = {"/school/1/": (403, {}), "/school/2/": (200, b"<html>maintenance</html>")}
+        with NutrisliceClient(base_url=stub_nutrislice.base_url, cache=MenuCache(0), max_workers=1) as client:
+            weeks = client.fetch_weeks(keys)
+
+    assert list(weeks) == [keys[0]]
+    assert list(client.stale_weeks) == [keys[0]]
+    assert client.unavailable_weeks == {keys[1], keys[2]}
+
+
+def test_get_menus_for_locations_builds_only_requested_meals(stub_nutrislice):
+    dates = [date(2026, 2, 2), date(2026, 2, 3)]
+
+    with NutrisliceClient(base_url=stub_nutrislice.base_url) as client:
+        menus = client.get_menus_for_locations([1], dates, meals={"dinner"})
+
+    assert list(menus) == [(1, dates[0]), (1, dates[1])]
+    assert {item.meal for items in menus.values() for item in items} == {"Dinner"}